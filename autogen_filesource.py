@@ -1,18 +1,34 @@
 """
-从交集分类中遍历 File 页面，取文件真实 URL（通过 API），下载到临时文件，
+从交集分类中遍历 File 页面，取文件真实 URL（通过 API），下载到临时文件（tmpfs），
 调用 Gradio /submit 获取 season/episode，替换/插入 Summary 段为:
     {{fi|s={{ep|SEASON|EP}}}}
+
+URL 解析、下载、识别、写入为四个并发阶段（见 process_intersection），并发数可分别配置。
 """
 import argparse
+import contextlib
+import itertools
 import os
 import re
 import tempfile
+import threading
 import time
 import traceback
+from collections import namedtuple
+
 import pywikibot
 import requests
 from gradio_client import Client, handle_file
 
+import edit_plan
+import season_registry
+from gradio_jobs import DEFAULT_RETRIES, DEFAULT_TIMEOUT, run_jobs
+from pipeline_stages import StageTimes, background, ordered_map
+from recognition_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL_DAYS, RecognitionCache
+import write_throttle
+from write_throttle import AdaptiveThrottle
+from wikitext_sections import SectionIndex
+
 # ------------------ 配置 ------------------
 WIKI_FAMILY = "xyy"
 WIKI_LANG = "en"
@@ -23,42 +39,149 @@ CAT_B = "Category:Donghua_screenshots"
 
 GRADIO_URL = "https://tuxiaobei-wesliesearch-vision.ms.show/"
 
+DEFAULT_CACHE_PATH = "recognition_cache.sqlite"
+
+EDIT_SUMMARY = "autofix file source with WeslieSearch-Vision (https://tuxiaobei-wesliesearch-vision.ms.show)"
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
     "Referer": "https://xyy.miraheze.org/"
 }
 # -----------------------------------------
 
-client = Client(GRADIO_URL)
-
-# 匹配 header 的正则（用于查找 Summary 段）
-SUMMARY_HEADER_RE = re.compile(r'^(?P<header>={2,}\s*Summary\s*={2,})', re.IGNORECASE | re.MULTILINE)
-NEXT_HEADER_RE = re.compile(r'^(={2,}.*?={2,})', re.MULTILINE)
-
-def get_file_url_via_api(filename: str) -> str | None:
+# 首次调用时才连接 Gradio（导入本模块不产生网络请求）
+client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global client
+    with _client_lock:
+        if client is None:
+            client = Client(GRADIO_URL)
+    return client
+
+# 复用同一个 HTTP 会话（keep-alive，避免每个文件都重新握手）
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+
+# 每个 API 请求的文件数（imageinfo 上限：普通账号 50，bot 500）
+IMAGEINFO_BATCH = 50
+
+# thumb_url: 请求了缩略图（iiurlwidth）且服务器返回时为缩略图 URL，否则为 None
+FileInfo = namedtuple("FileInfo", ["url", "sha1", "size", "mime", "thumb_url"])
+
+# 下载的图片放在 tmpfs（/dev/shm，内存）中交给 Gradio；超过该大小的才落到磁盘临时目录
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+SPOOL_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# 小于该大小的文件一次性读完，否则按大块流式写入
+SINGLE_READ_BYTES = 2 * 1024 * 1024
+DOWNLOAD_CHUNK = 1024 * 1024
+
+# 分类查询请求失败（HTTP 错误、超时、API 返回 error）时的重试次数；第 n 次重试前等待 API_RETRY_DELAY * 2**(n-1) 秒
+API_RETRIES = 3
+API_RETRY_DELAY = 2.0
+
+def _api_query(params, retries=API_RETRIES):
+    """GET 一次 API 查询并返回 JSON；暂时性失败按指数退避重试，重试用尽后抛出最后一次的异常。"""
+    for attempt in range(retries + 1):
+        try:
+            r = SESSION.get(API_BASE, params=params, timeout=30)
+            r.raise_for_status()
+            j = r.json()
+            if "error" in j:
+                raise RuntimeError(f"API error: {j['error'].get('info', j['error'])}")
+            return j
+        except (requests.RequestException, ValueError, RuntimeError) as e:
+            if attempt >= retries:
+                raise
+            delay = API_RETRY_DELAY * 2 ** attempt
+            print(f"[Retry] Category query failed ({e}); retry {attempt + 1}/{retries} in {delay:.0f}s")
+            time.sleep(delay)
+
+def iter_intersection(cat_a=CAT_A, cat_b=CAT_B, batch_size=IMAGEINFO_BATCH, thumb_width=None):
     """
-    使用 MediaWiki API 获取文件真实 URL（imageinfo -> url）。
-    filename 应为不带前缀的文件名，例如 '0-1.png'。
-    返回 URL 或 None。
+    流式产出同时属于 cat_a 与 cat_b 的文件 (title, FileInfo)。
+    只遍历 cat_a（较小的分类）：generator=categorymembers 每批 batch_size 个文件，
+    同一请求里用 prop=categories&clcategories=cat_b 判断是否属于 cat_b，并带上 imageinfo
+    （url / sha1 / size / mime）。每批在 batchcomplete 后立即产出，不必先遍历完两个分类。
+    thumb_width 不为空时同时请求该宽度的服务器端缩略图（iiurlwidth），识别时下载缩略图而非原图。
     """
-    params = {
+    base = {
         "action": "query",
-        "prop": "imageinfo",
-        "titles": f"File:{filename}",
-        "iiprop": "url",
-        "format": "json"
+        "generator": "categorymembers",
+        "gcmtitle": cat_a,
+        "gcmnamespace": "6",
+        "gcmlimit": str(batch_size),
+        "prop": "categories|imageinfo",
+        "clcategories": cat_b,
+        "cllimit": "max",
+        "iiprop": "url|sha1|size|mime",
+        "format": "json",
+        "formatversion": "2",
     }
+    if thumb_width:
+        base["iiurlwidth"] = str(thumb_width)
+    params = dict(base)
+    batch = {}
+    while True:
+        j = _api_query(params)
+        # 一批结果可能跨多个 continue 返回（categories / imageinfo 分别续传），按标题合并
+        for pdata in j.get("query", {}).get("pages", []):
+            entry = batch.setdefault(pdata["title"], [False, None])
+            if pdata.get("categories"):
+                entry[0] = True
+            if pdata.get("imageinfo"):
+                ii = pdata["imageinfo"][0]
+                entry[1] = FileInfo(ii.get("url"), ii.get("sha1"), ii.get("size"), ii.get("mime"),
+                                    ii.get("thumburl"))
+        if j.get("batchcomplete"):
+            for title, (in_b, info) in batch.items():
+                if in_b:
+                    yield title, info
+            batch = {}
+        if "continue" not in j:
+            break
+        params = dict(base, **j["continue"])
+
+def download_image(url, size=None) -> bytes:
+    """
+    下载文件，返回内容（只在内存中）。size 为 imageinfo 给出的字节数（未知时用 Content-Length）；
+    小文件一次读完，大文件按 DOWNLOAD_CHUNK 大块读取。
+    """
+    with SESSION.get(url, stream=True, timeout=30) as resp:
+        resp.raise_for_status()
+        if size is None:
+            size = int(resp.headers.get("Content-Length") or 0) or None
+        if size is not None and size <= SINGLE_READ_BYTES:
+            return resp.content
+        return b"".join(resp.iter_content(chunk_size=DOWNLOAD_CHUNK))
+
+@contextlib.contextmanager
+def spooled_image(data: bytes, suffix=".png"):
+    """
+    把图片内容写成一个本地路径（供 handle_file 使用）；退出 with 块时文件一定被删除。
+    不超过 SPOOL_MAX_BYTES 时文件只存在于 tmpfs，不写持久磁盘。
+    """
+    directory = SPOOL_DIR if len(data) <= SPOOL_MAX_BYTES else None
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
     try:
-        r = requests.get(API_BASE, params=params, headers=HEADERS, timeout=20)
-        r.raise_for_status()
-        j = r.json()
-        pages = j.get("query", {}).get("pages", {})
-        for pid, pdata in pages.items():
-            if "imageinfo" in pdata:
-                return pdata["imageinfo"][0].get("url")
-    except Exception as e:
-        print("  [API error] get_file_url_via_api:", e)
-    return None
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def submit_recognition(image_path):
+    """向 WeslieSearch-Vision /submit 提交一个任务（不等待），返回 gradio_client 的 Job。"""
+    return get_client().submit(
+        img=handle_file(image_path),
+        query_num=1,
+        season_filter="",
+        api_name="/submit"
+    )
 
 def parse_top_season_episode(result_tuple):
     """
@@ -75,6 +198,12 @@ def parse_top_season_episode(result_tuple):
         s = re.split(r'[：:\s]', str(season_raw).strip())[0]
         m = re.match(r'([A-Za-z0-9_+-]+)', s)
         season_code = m.group(1) if m else s
+        # 已注册的代号统一规范化；未注册的照旧使用，但给出提示
+        known = season_registry.canonical_season_code(season_code)
+        if known:
+            season_code = known
+        elif season_code:
+            print(f"  [warn] season code {season_code!r} is not in season_registry")
 
         # episode: 找第一个数字
         em = re.search(r'(\d+)', str(ep_raw))
@@ -95,162 +224,358 @@ def replace_or_insert_summary_simple(text: str, new_content: str) -> (str, bool)
     if text is None:
         text = ""
 
-    # search for Summary header
-    m = SUMMARY_HEADER_RE.search(text)
-    if m:
-        # header starts at m.start(); find end of this section (next header after m.end())
-        start_of_section = m.end()
-        # find next header after start_of_section
-        next_m = NEXT_HEADER_RE.search(text, pos=start_of_section)
-        end_of_section = next_m.start() if next_m else len(text)
-        # build new text
-        new_text = text[:m.end()] + "\n" + new_content.strip() + "\n" + text[end_of_section:]
+    # header 只扫描一次；Summary 段及插入位置都从索引里取
+    index = SectionIndex(text)
+    summary = index.get("summary")
+    if summary:
+        # 替换 header 之后到下一 header 之前的内容
+        new_text = index.splice(summary.header_end, summary.end, "\n" + new_content.strip() + "\n")
         changed = not (new_text.strip() == text.strip())
         return new_text, changed
     else:
         # no Summary header: insert at top before first header if any, else prepend
-        first_header = NEXT_HEADER_RE.search(text)
-        if first_header:
-            insert_pos = first_header.start()
-            new_text = text[:insert_pos] + "== Summary ==\n" + new_content.strip() + "\n\n" + text[insert_pos:]
+        if index.sections:
+            new_text = index.insert(index.sections[0].start, "== Summary ==\n" + new_content.strip() + "\n\n")
         else:
             # no headers at all
             new_text = "== Summary ==\n" + new_content.strip() + "\n\n" + text
         changed = not (new_text.strip() == text.strip())
         return new_text, changed
 
-def process_intersection(auto_apply=False, limit=None):
+def get_site():
     site = pywikibot.Site(WIKI_LANG, WIKI_FAMILY)
     site.login()
+    return site
 
-    cat_a = pywikibot.Category(site, CAT_A)
-    cat_b = pywikibot.Category(site, CAT_B)
+# 流水线中每个文件的状态；note 非空表示该文件已被跳过（原因）
+# phash: 启用近似重复检测时下载阶段算出的感知哈希
+# width: 识别所用图片的缩略图宽度（None 为原图），识别缓存按它区分
+Job = namedtuple("Job", ["page", "info", "image", "season_code", "ep_num", "source", "note", "phash", "width"],
+                 defaults=(None,))
 
-    members_a = {p.title() for p in cat_a.members(namespaces=6)}
-    members_b = {p.title() for p in cat_b.members(namespaces=6)}
-    intersection = sorted(members_a & members_b)
+class _Inherited:
+    """近似重复图片的"任务"：不调用模型，直接跟随另一张图片（leader）的识别任务取结果。"""
+    def __init__(self, leader):
+        self.leader = leader
 
-    print(f"Found {len(intersection)} file pages in intersection.")
-    if limit:
-        intersection = intersection[:limit]
+    def done(self):
+        return self.leader.done()
 
-    for title in intersection:
-        try:
-            print("\n---\nProcessing:", title)
-            page = pywikibot.Page(site, title)
-            if not page.exists():
-                print(" Page does not exist; skip.")
-                continue
+    def result(self, timeout=None):
+        return self.leader.result(timeout)
 
-            # extract filename
-            if title.lower().startswith("file:"):
-                filename = title.split(":", 1)[1]
-            else:
-                print(" Not a file page; skip.")
-                continue
+    def cancel(self):
+        return False
 
-            # get canonical file url from API
-            file_url = get_file_url_via_api(filename)
-            if not file_url:
-                print("  Could not get remote file URL via API; skip.")
-                continue
-            print("  file URL:", file_url)
 
-            # download to temporary file
+def iter_resolved_jobs(site, entries, cache, times, batch_size=IMAGEINFO_BATCH, thumb_width=None):
+    """
+    阶段 1（URL 解析）：从 entries（iter_intersection 的 (title, FileInfo)）每取 batch_size 个文件
+    做一次页面预加载，产出 Job。识别缓存命中的文件在这里就带上 season/episode，后续阶段直接放行。
+    thumb_width: 有缩略图 URL 的文件按该宽度查缓存（没有该宽度的结果时可用原图的结果）。
+    """
+    entries = iter(entries)
+    while True:
+        t0 = time.perf_counter()
+        chunk = list(itertools.islice(entries, batch_size))
+        if not chunk:
+            break
+        pages = [pywikibot.Page(site, title) for title, _ in chunk]
+        try:
+            for _ in site.preloadpages(pages, groupsize=batch_size):
+                pass
+        except Exception as e:
+            # 这一批整体失败（APIError / ServerError / 超时等）：逐个标记跳过，不影响后续批次
+            times.add("resolve", time.perf_counter() - t0, len(chunk))
+            for page, (_, info) in zip(pages, chunk):
+                yield Job(page, info, None, None, None, None, f"resolve failed: {e}", None)
+            continue
+        times.add("resolve", time.perf_counter() - t0, len(chunk))
+        for page, (_, info) in zip(pages, chunk):
+            job = Job(page, info, None, None, None, None, None, None)
             try:
-                resp = requests.get(file_url, headers=HEADERS, stream=True, timeout=30)
-                resp.raise_for_status()
+                exists = page.exists()
             except Exception as e:
-                print("  download failed:", e)
+                yield job._replace(note=f"resolve failed: {e}")
                 continue
+            if not exists:
+                yield job._replace(note="Page does not exist; skip.")
+            elif not page.title().lower().startswith("file:"):
+                yield job._replace(note="Not a file page; skip.")
+            elif not job.info or not job.info.url:
+                yield job._replace(note="Could not get remote file URL via API; skip.")
+            else:
+                width = thumb_width if job.info.thumb_url else None
+                cached = cache.get(job.info.sha1, width) if cache is not None else None
+                if cached:
+                    yield job._replace(season_code=cached.season_code, ep_num=cached.ep_num, source="cache")
+                else:
+                    yield job
+
+def process_intersection(auto_apply=False, limit=None, plan=None, cache=None,
+                         download_workers=4, inference_workers=1, prefetch=None, write_interval=None,
+                         job_timeout=DEFAULT_TIMEOUT, job_retries=DEFAULT_RETRIES, thumb_width=None,
+                         near_dup_distance=None, hash_method="phash"):
+    """
+    分阶段并发处理交集中的文件，各阶段之间用有界队列衔接、保持输入顺序：
+        URL 解析（后台线程）→ 下载（download_workers 个线程）
+        → 识别（gradio job API，最多 inference_workers 个任务在途，按完成顺序返回；
+          单个任务超过 job_timeout 秒或出错时最多重试 job_retries 次）
+        → 写入（主线程，串行；AdaptiveThrottle 从 write_interval 秒
+          （默认为站点的 put_throttle）的间隔开始按服务器状况调整）
+    prefetch 为每个阶段最多提前缓冲的文件数。结束时打印各阶段耗时汇总。
+    plan 不为 None 时只把拟议编辑写入编辑计划（edit_plan.PlanWriter），不预览、不保存。
+    cache 为 RecognitionCache 时按文件 SHA1 复用识别结果，命中则不下载、不调用 Gradio。
+    thumb_width 不为空时下载该宽度的服务器端缩略图代替原图（没有缩略图 URL 时退回原图）。
+    near_dup_distance 不为空时计算每张图片的感知哈希（hash_method），与本次运行中已提交识别的图片
+    汉明距离不超过该值的直接沿用其结果（sflag 标记为 inherited），不再调用模型。
+    """
+    site = get_site()
 
-            fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1] or ".png")
-            os.close(fd)
-            with open(tmp_path, "wb") as f:
-                for chunk in resp.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-
-            # call gradio
-            try:
-                result = client.predict(
-                    img=handle_file(tmp_path),
-                    query_num=1,
-                    season_filter="",
-                    api_name="/submit"
-                )
-            except Exception as e:
-                print("  Gradio call failed:", e)
-                # cleanup tmp
+    # 交集是流式算出的：第一批文件在第一个 API 请求返回后就开始处理
+    print(f"Streaming files in both {CAT_A} and {CAT_B} ...")
+    intersection = iter_intersection(thumb_width=thumb_width)
+    if limit:
+        intersection = itertools.islice(intersection, limit)
+    processed = 0
+
+    depth = prefetch or 2 * max(download_workers, inference_workers, 1)
+    times = StageTimes(workers={"download": download_workers, "inference": inference_workers})
+    downloaded_bytes = [0]
+    bytes_lock = threading.Lock()
+
+    near_dup = None
+    if near_dup_distance is not None:
+        # Pillow / NumPy 只有启用近似重复检测时才需要
+        import image_hash
+        near_dup = image_hash.NearDuplicateIndex(near_dup_distance)
+    followers = {}  # title -> 所跟随的 leader 标题
+    inherited_count = 0
+
+    def download(job):
+        if job.note or job.source:
+            return job
+        with times.measure("download"):
+            # 有缩略图就下缩略图（大小未知，由 Content-Length 决定读取方式）；
+            # 缩略图下载失败（404、生成缩略图出错等）或没有缩略图时下原图
+            image = None
+            width = None
+            if job.info.thumb_url:
+                try:
+                    image = download_image(job.info.thumb_url)
+                    width = thumb_width
+                except requests.RequestException as e:
+                    print(f"[Thumb] {job.page.title()}: {e}; falling back to the original")
+            if image is None:
                 try:
-                    os.remove(tmp_path)
-                except Exception:
-                    pass
+                    image = download_image(job.info.url, job.info.size)
+                except requests.RequestException as e:
+                    return job._replace(note=f"download failed: {e}")
+        with bytes_lock:
+            downloaded_bytes[0] += len(image)
+        if near_dup is not None:
+            with times.measure("hash"):
+                job = job._replace(phash=image_hash.image_hash(image, hash_method))
+        return job._replace(image=image, width=width)
+
+    # 每个待识别文件的临时文件（重试时复用），任务最终完成后由 release 删除
+    spools = {}
+
+    def submit(job):
+        if job.note or job.source:
+            return None
+        title = job.page.title()
+        followers.pop(title, None)
+        if near_dup is not None and job.phash is not None:
+            # 重试时先去掉自己上一次（失败的）任务，避免跟随自己
+            near_dup.remove(title)
+            match = near_dup.nearest(job.phash)
+            if match:
+                followers[title] = match[0]
+                return _Inherited(match[1])
+        if title not in spools:
+            stack = contextlib.ExitStack()
+            path = stack.enter_context(spooled_image(job.image, os.path.splitext(title)[1] or ".png"))
+            spools[title] = (stack, path, time.perf_counter())
+        gradio_job = submit_recognition(spools[title][1])
+        if near_dup is not None and job.phash is not None:
+            near_dup.add(job.phash, title, gradio_job)
+        return gradio_job
+
+    def release(job):
+        entry = spools.pop(job.page.title(), None)
+        if entry:
+            entry[0].close()
+            times.add("inference", time.perf_counter() - entry[2])
+
+    def iter_recognized(jobs):
+        # 在识别线程里迭代 run_jobs；被关闭时由 run_jobs 关闭上游（下载 → URL 解析）
+        with contextlib.closing(run_jobs(submit, jobs, max_in_flight=inference_workers, timeout=job_timeout,
+                                         retries=job_retries, release=release)) as results:
+            yield from _recognized(results)
+
+    def _recognized(results):
+        nonlocal inherited_count
+        for job, result, error in results:
+            if job.note or job.source:
+                yield job
+                continue
+            title = job.page.title()
+            leader = followers.pop(title, None)
+            if error is not None:
+                if near_dup is not None:
+                    near_dup.remove(title)
+                yield job._replace(image=None, note=f"Gradio call failed: {error}")
                 continue
-
             season_code, ep_num = parse_top_season_episode(result)
             if not season_code or not ep_num:
-                print("  cannot parse season/episode from result; sample:", result[:12])
-                try:
-                    os.remove(tmp_path)
-                except Exception:
-                    pass
+                yield job._replace(image=None,
+                                   note=f"cannot parse season/episode from result; sample: {result[:12]}")
+                continue
+            if leader:
+                inherited_count += 1
+                yield job._replace(image=None, season_code=season_code, ep_num=ep_num,
+                                   source="inherited")
                 continue
+            if cache is not None:
+                cache.put(job.info.sha1, result, season_code, ep_num, job.width)
+            yield job._replace(image=None, season_code=season_code, ep_num=ep_num, source="model")
 
-            print(f"  Parsed: season={season_code}, episode={ep_num}")
+    resolved = background(iter_resolved_jobs(site, intersection, cache, times, thumb_width=thumb_width), depth)
+    downloaded = ordered_map(download, resolved, workers=download_workers, depth=depth)
+    recognized = background(iter_recognized(downloaded), depth)
 
-            new_inner = "{{fi|s={{ep|" + season_code + "|" + ep_num + "}}|sflag=WeslieSearch-Vision}}"
-            old_text = page.text or ""
-            new_text, changed = replace_or_insert_summary_simple(old_text, new_inner)
-            if not changed:
-                print("  No change needed.")
-                try:
-                    os.remove(tmp_path)
-                except Exception:
-                    pass
-                continue
+    if write_interval is None:
+        throttle = AdaptiveThrottle.for_site(site)
+    else:
+        throttle = AdaptiveThrottle.for_site(site, interval=write_interval)
+    try:
+        while True:
+            # 写入阶段等待上游的时间：数值大说明瓶颈在前面的阶段
+            with times.measure("wait"):
+                job = next(recognized, None)
+            if job is None:
+                break
+            title = job.page.title()
+            processed += 1
+            try:
+                print("\n---\nProcessing:", title)
+                if job.note:
+                    print(" ", job.note)
+                    continue
+                if job.source == "cache":
+                    print(f"  cache hit (sha1 {job.info.sha1[:12]})")
+                elif job.source == "inherited":
+                    print("  near-duplicate of an image recognised in this run; result inherited")
+                else:
+                    print("  file URL:", job.info.thumb_url or job.info.url)
+                print(f"  Parsed: season={job.season_code}, episode={job.ep_num}")
+
+                sflag = "WeslieSearch-Vision (inherited)" if job.source == "inherited" else "WeslieSearch-Vision"
+                new_inner = "{{fi|s={{ep|" + job.season_code + "|" + job.ep_num + "}}|sflag=" + sflag + "}}"
+                old_text = job.page.text or ""
+                new_text, changed = replace_or_insert_summary_simple(old_text, new_inner)
+                if not changed:
+                    print("  No change needed.")
+                    continue
 
-            # preview + prompt (unless auto_apply)
-            if not auto_apply:
-                print("  Preview (first 200 lines):")
-                print("\n".join(new_text.splitlines()[:200]))
-                ans = input(" Apply this edit? (y/N): ").strip().lower()
-                if ans != "y":
-                    print("  skipped by user.")
-                    try:
-                        os.remove(tmp_path)
-                    except Exception:
-                        pass
+                if plan is not None:
+                    plan.add(job.page, old_text, new_text, EDIT_SUMMARY)
                     continue
 
-            # save page
-            try:
-                page.text = new_text
-                page.save(summary="autofix file source with WeslieSearch-Vision (https://tuxiaobei-wesliesearch-vision.ms.show)")
-                print("  Saved.")
-            except Exception as e:
-                print("  Save failed:", e)
-            finally:
-                try:
-                    os.remove(tmp_path)
-                except Exception:
-                    pass
+                # preview + prompt (unless auto_apply)
+                if not auto_apply:
+                    print("  Preview (first 200 lines):")
+                    print("\n".join(new_text.splitlines()[:200]))
+                    ans = input(" Apply this edit? (y/N): ").strip().lower()
+                    if ans != "y":
+                        print("  skipped by user.")
+                        continue
 
-            # small delay to be polite
-            time.sleep(1.0)
+                with times.measure("write"):
+                    try:
+                        job.page.text = new_text
+                        throttle.call(job.page.save, summary=EDIT_SUMMARY)
+                        print("  Saved.")
+                    except Exception as e:
+                        print("  Save failed:", e)
 
-        except Exception as e:
-            print(" ERROR processing", title, ":", e)
-            traceback.print_exc()
-            input("Press Enter to continue...")
+            except Exception as e:
+                print(" ERROR processing", title, ":", e)
+                traceback.print_exc()
+                input("Press Enter to continue...")
+    finally:
+        # 只关闭最下游；上游各阶段由迭代它们的线程依次关闭
+        recognized.close()
+        print(f"\nProcessed {processed} file page(s) in the intersection; "
+              f"downloaded {downloaded_bytes[0] / 1e6:.1f} MB of images.")
+        if near_dup is not None:
+            print(f"Near-duplicate images: {inherited_count} inference call(s) saved.")
+        print(throttle.summary())
+        print("Stage times:")
+        print(times.summary())
 
 def main():
+    global GRADIO_URL
     parser = argparse.ArgumentParser(description="Update file pages from Gradio results")
     parser.add_argument("--yes", action="store_true", help="Auto apply edits without prompting")
     parser.add_argument("--limit", type=int, default=None, help="Limit number of pages")
+    parser.add_argument("--download-workers", type=int, default=4,
+                        help="Concurrent image downloads (default: %(default)s)")
+    parser.add_argument("--inference-workers", type=int, default=1, metavar="K",
+                        help="WeslieSearch-Vision jobs kept in flight (default: %(default)s)")
+    parser.add_argument("--job-timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Seconds before a recognition job is cancelled and retried (default: %(default)s)")
+    parser.add_argument("--job-retries", type=int, default=DEFAULT_RETRIES,
+                        help="Retries per file after a failed or timed-out job (default: %(default)s)")
+    parser.add_argument("--gradio-url", default=None,
+                        help=f"WeslieSearch-Vision endpoint (default: {GRADIO_URL}); e.g. a local stub app")
+    parser.add_argument("--prefetch", type=int, default=None, metavar="N",
+                        help="Files buffered between stages (default: 2x the larger worker count)")
+    parser.add_argument("--thumb-width", type=int, default=None, metavar="PX",
+                        help="Recognise server-side thumbnails of this width instead of the originals")
+    parser.add_argument("--near-dup-distance", type=int, default=None, metavar="BITS",
+                        help="Reuse the result of an image recognised in this run when the perceptual hashes "
+                             "differ by at most BITS (of 64), e.g. 6; needs Pillow + NumPy")
+    parser.add_argument("--hash-method", choices=("phash", "dhash"), default="phash",
+                        help="Perceptual hash for --near-dup-distance (default: %(default)s)")
+    parser.add_argument("--write-interval", type=float, default=None,
+                        help="Initial seconds between saves; adapts to server load (default: the site's put_throttle)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help="SHA1-keyed recognition cache (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the recognition cache")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="Ignore cached results (e.g. after a model update) and overwrite them")
+    parser.add_argument("--cache-ttl-days", type=float, default=DEFAULT_TTL_DAYS,
+                        help="Cached results older than this are re-recognised (default: %(default)s)")
+    parser.add_argument("--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Evict the oldest entries beyond this count (default: %(default)s)")
+    edit_plan.add_arguments(parser)
+    write_throttle.add_arguments(parser)
     args = parser.parse_args()
-
-    process_intersection(auto_apply=args.yes, limit=args.limit)
+    write_throttle.configure(args)
+
+    if args.gradio_url:
+        GRADIO_URL = args.gradio_url
+
+    if edit_plan.run_plan_command(args, get_site):
+        return
+    plan = edit_plan.PlanWriter(args.plan) if args.plan else None
+    cache = None
+    if not args.no_cache:
+        cache = RecognitionCache(args.cache, ttl_days=args.cache_ttl_days,
+                                 max_entries=args.cache_max_entries, refresh=args.refresh_cache)
+    try:
+        process_intersection(auto_apply=args.yes, limit=args.limit, plan=plan, cache=cache,
+                             download_workers=args.download_workers, inference_workers=args.inference_workers,
+                             prefetch=args.prefetch, write_interval=args.write_interval,
+                             job_timeout=args.job_timeout, job_retries=args.job_retries,
+                             thumb_width=args.thumb_width, near_dup_distance=args.near_dup_distance,
+                             hash_method=args.hash_method)
+    finally:
+        if cache is not None:
+            print(f"Recognition cache: {cache.hits} hit(s), {cache.misses} miss(es), {len(cache)} entries")
+            cache.close()
 
 if __name__ == "__main__":
     main()
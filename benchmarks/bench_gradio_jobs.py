@@ -0,0 +1,70 @@
+"""
+测量 gradio_jobs.run_jobs 在不同在途任务数 K 下的吞吐量（默认对本地替身 stub_gradio_app.py）。
+
+用法：
+    python benchmarks/stub_gradio_app.py --latency 2 &
+    python benchmarks/bench_gradio_jobs.py --gradio-url http://127.0.0.1:7861/ -n 32 -k 1 2 4 8
+"""
+import argparse
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gradio_client import Client, handle_file  # noqa: E402
+
+from gradio_jobs import run_jobs  # noqa: E402
+
+
+def tiny_png():
+    """生成一个 1x1 的 PNG（替身不看图片内容）。"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(b"\x00\xff\xff\xff\xff"))
+            + chunk(b"IEND", b""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of parallel Gradio job submission")
+    parser.add_argument("--gradio-url", default="http://127.0.0.1:7861/")
+    parser.add_argument("-n", "--jobs", type=int, default=32, help="jobs per run (default: %(default)s)")
+    parser.add_argument("-k", "--in-flight", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="in-flight limits to compare (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--retries", type=int, default=2)
+    args = parser.parse_args()
+
+    client = Client(args.gradio_url)
+    fd, path = tempfile.mkstemp(suffix=".png")
+    with os.fdopen(fd, "wb") as f:
+        f.write(tiny_png())
+
+    def submit(_):
+        return client.submit(img=handle_file(path), query_num=1, season_filter="", api_name="/submit")
+
+    try:
+        print(f"{'K':>4} {'ok':>5} {'failed':>7} {'seconds':>9} {'jobs/s':>8}")
+        for k in args.in_flight:
+            ok = failed = 0
+            t0 = time.perf_counter()
+            for _, result, error in run_jobs(submit, range(args.jobs), max_in_flight=k,
+                                             timeout=args.timeout, retries=args.retries):
+                if error is None:
+                    ok += 1
+                else:
+                    failed += 1
+            elapsed = time.perf_counter() - t0
+            print(f"{k:>4} {ok:>5} {failed:>7} {elapsed:>9.2f} {args.jobs / elapsed:>8.2f}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
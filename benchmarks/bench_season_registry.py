@@ -0,0 +1,101 @@
+"""
+parse_title 季度代号匹配的微基准：旧版（每次调用重新拼接并编译 alternation 正则）
+对比 season_registry 预建前缀树。
+
+用法：
+    python benchmarks/bench_season_registry.py [titles.txt|pages_list.csv] [--repeat N]
+
+标题列表每行一个（save_allpages.py 导出的 CSV 亦可，表头自动跳过）；
+不提供时用注册表生成一份合成标题列表。只做本地计算，不访问 wiki。
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import season_registry  # noqa: E402
+
+# 代号互为前缀、集数有歧义的标题及期望的解析结果；每次都列出旧正则与新实现的结果
+AMBIGUOUS_TITLES = {
+    'File:YS1104.png': ('ys1', '104'),
+    'File:PGFC101.png': ('pgfc', '101'),
+    'File:MttNW201.png': ('mttnw2', '01'),
+    'File:M1001.png': ('m10', '01'),
+    'File:MLD52.png': ('mld', '52'),
+}
+
+
+def legacy_match(title):
+    """旧版 parse_title 的匹配部分（原样保留，含每次调用的正则编译）。"""
+    season_pattern = '|'.join(re.escape(s) for s in season_registry.SEASON_CODES)
+    pattern = rf'^File:({season_pattern})(\d+)\.png$'
+    match = re.match(pattern, title.lower(), flags=re.IGNORECASE)
+    if match:
+        return match.group(1), match.group(2)
+    return None
+
+
+def load_titles(path):
+    titles = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.reader(f):
+            if row and row[0].strip() and row[0].strip() != 'Page title':
+                titles.append(row[0].strip())
+    return titles
+
+
+def synthetic_titles():
+    titles = []
+    for code in season_registry.SEASON_CODES:
+        for ep in (1, 9, 10, 52, 104):
+            titles.append(f"File:{code.upper()}{ep:02d}.png")
+        titles.append(f"File:{code} still 1.jpg")
+        titles.append(f"File:{code.title()} logo.png")
+    return titles
+
+
+def bench(fn, titles, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for t in titles:
+            fn(t)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('titles', nargs='?', help='title list (one per line / CSV first column)')
+    parser.add_argument('--repeat', type=int, default=5, help='best of N runs (default: %(default)s)')
+    args = parser.parse_args()
+
+    titles = load_titles(args.titles) if args.titles else synthetic_titles()
+    print(f"{len(titles)} titles, best of {args.repeat}")
+
+    legacy = bench(legacy_match, titles, args.repeat)
+    registry = bench(season_registry.match_file_title, titles, args.repeat)
+    for name, secs in (('legacy regex', legacy), ('season_registry', registry)):
+        print(f"  {name:<16} {secs * 1e3:9.2f} ms total  {secs / len(titles) * 1e6:8.2f} us/title")
+    print(f"  speedup: {legacy / registry:.1f}x")
+
+    print("  ambiguous titles:")
+    for t, expected in AMBIGUOUS_TITLES.items():
+        new = season_registry.match_file_title(t)
+        mark = 'ok' if new == expected else f'WRONG, expected {expected}'
+        print(f"    {t}: legacy={legacy_match(t)} registry={new} {mark}")
+
+    # 旧正则按列表顺序取第一个能匹配的代号，新实现只接受合法集数的拆分；列出结果不同的标题
+    diffs = [(t, legacy_match(t), season_registry.match_file_title(t))
+             for t in titles if legacy_match(t) != season_registry.match_file_title(t)]
+    print(f"  titles parsed differently: {len(diffs)}")
+    for t, old, new in diffs[:20]:
+        print(f"    {t}: legacy={old} registry={new}")
+
+
+if __name__ == '__main__':
+    main()
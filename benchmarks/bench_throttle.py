@@ -0,0 +1,262 @@
+"""
+写入节流基准：本地替身服务器（http.server）模拟 wiki 的写入接口并注入延迟，
+比较脚本原来的固定节奏与 write_throttle.AdaptiveThrottle.for_site() 的平均写入速率。
+
+两种策略都经过同一个 pywikibot 式的保存（StubSite）：
+- 每次请求前按 put_throttle（--writedelay，pywikibot 默认 10 秒）等待；
+- maxlag / 429 / 503 按 Retry-After 等待后在内部重试，最多 --pwb-retries 次，
+  用尽后像 Page.save 一样抛出 OtherPageSaveError（包着 APIError / ServerError）。
+fixed 就是原来的脚本：只有 put_throttle 的固定间隔。
+adaptive 用脚本实际调用的 AdaptiveThrottle.for_site(site)，下限与目标耗时取
+write_throttle 的设置（可用 --min-write-interval / --target-save-latency 覆盖）。
+装了 pywikibot 时使用它的异常类，否则用结构相同的替身。
+
+替身服务器的行为：
+- 每次保存耗时 --base-latency 秒；
+- 最近 1 秒内写入数超过 --soft-limit 时，每多一次写入响应变慢 --lag-step 秒，复制延迟同样增加；
+- 复制延迟超过 maxlag（5 秒）时返回 503 + Retry-After（MediaWiki 的 maxlag 错误）；
+- 每 --spike-every 秒有一段 --spike-length 秒的延迟高峰（maxlag）；
+- 最近 1 秒内写入数超过 --hard-limit 时返回 429 + Retry-After: 1（ratelimited）。
+
+用法：
+    python benchmarks/bench_throttle.py --edits 20
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import write_throttle  # noqa: E402
+from write_throttle import AdaptiveThrottle, retry_hint  # noqa: E402
+
+try:
+    from pywikibot.exceptions import APIError, OtherPageSaveError, ServerError
+except ImportError:
+    class APIError(Exception):
+        def __init__(self, code, info, **kwargs):
+            self.code = code
+            self.info = info
+            self.other = kwargs
+            super().__init__(f"{code}: {info}")
+
+    class ServerError(Exception):
+        pass
+
+    class OtherPageSaveError(Exception):
+        def __init__(self, page, reason):
+            self.page = page
+            self.reason = reason
+            super().__init__(f"Edit to page {page.title(as_link=True)} failed:\n{reason}")
+
+MAXLAG = 5
+
+
+class StubWiki:
+    def __init__(self, base_latency, soft_limit, hard_limit, lag_step, spike_every, spike_length):
+        self.base_latency = base_latency
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self.lag_step = lag_step
+        self.spike_every = spike_every
+        self.spike_length = spike_length
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.started = time.monotonic()
+        self.counts = {'ok': 0, 'ratelimited': 0, 'maxlag': 0}
+
+    def handle(self):
+        """返回 (status, headers, body, latency)。"""
+        with self.lock:
+            now = time.monotonic()
+            while self.recent and now - self.recent[0] > 1.0:
+                self.recent.popleft()
+            load = len(self.recent)
+            excess = max(0, load - self.soft_limit)
+            lag = excess * self.lag_step * 10
+            if self.spike_every and (now - self.started) % self.spike_every < self.spike_length:
+                lag += MAXLAG + 1
+            if load >= self.hard_limit:
+                self.counts['ratelimited'] += 1
+                return 429, {'Retry-After': '1'}, {'error': {'code': 'ratelimited'}}, 0.0
+            if lag > MAXLAG:
+                self.counts['maxlag'] += 1
+                return 503, {'Retry-After': str(int(lag) - MAXLAG + 1)}, {'error': {'code': 'maxlag', 'lag': lag}}, 0.0
+            self.recent.append(now)
+            self.counts['ok'] += 1
+        return 200, {}, {'edit': {'result': 'Success'}}, self.base_latency + excess * self.lag_step
+
+
+def serve(wiki):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            status, headers, body, latency = wiki.handle()
+            time.sleep(latency)
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_edit(url):
+    def edit():
+        req = urllib.request.Request(url, data=b'action=edit', method='POST')
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return json.load(resp)
+    return edit
+
+
+class StubPutThrottle:
+    """pywikibot 的 put_throttle：两次写入请求开始之间至少隔 writedelay 秒。"""
+
+    def __init__(self, writedelay):
+        self.writedelay = writedelay
+        self.last_write = None
+
+    def set_delays(self, *, delay=None, writedelay=None, absolute=False):
+        if writedelay is not None:
+            self.writedelay = writedelay
+
+    def wait(self):
+        now = time.monotonic()
+        if self.last_write is not None and self.last_write + self.writedelay > now:
+            time.sleep(self.last_write + self.writedelay - now)
+        self.last_write = time.monotonic()
+
+
+class StubSite:
+    def __init__(self, writedelay):
+        self.throttle = StubPutThrottle(writedelay)
+
+
+class BenchPage:
+    """OtherPageSaveError 只用到 page.title() 与 page.site。"""
+    site = None
+
+    def title(self, as_link=False):
+        return '[[Bench]]' if as_link else 'Bench'
+
+
+def _api_error(e):
+    body = json.load(e)
+    code = body.get('error', {}).get('code')
+    if code == 'maxlag':
+        err = APIError('maxlag', 'Waiting for a database server', lag=body['error'].get('lag'))
+    elif code:
+        err = APIError(code, f"HTTP {e.code}")
+    else:
+        err = ServerError(f"{e.code} Server Error")
+    err.headers = e.headers
+    return err
+
+
+def make_pwb_save(url, site, retries):
+    """
+    像 Page.save 一样保存：每次请求前等 put_throttle，可重试的错误在内部等 Retry-After 后重试，
+    用尽后抛出 OtherPageSaveError。
+    """
+    edit = make_edit(url)
+    page = BenchPage()
+
+    def save():
+        for attempt in range(retries + 1):
+            site.throttle.wait()
+            try:
+                return edit()
+            except urllib.error.HTTPError as e:
+                err = _api_error(e)
+            retryable, retry_after = retry_hint(err)
+            if not retryable or attempt == retries:
+                raise OtherPageSaveError(page, err) from err
+            time.sleep(retry_after or 5)
+    return save
+
+
+def run_fixed(save, n):
+    """原来的脚本：只有 put_throttle 的固定间隔。"""
+    ok = 0
+    t0 = time.monotonic()
+    for _ in range(n):
+        try:
+            save()
+            ok += 1
+        except Exception:
+            pass
+    return ok, time.monotonic() - t0, None
+
+
+def run_adaptive(save, site, n):
+    throttle = AdaptiveThrottle.for_site(site)
+    ok = 0
+    t0 = time.monotonic()
+    for _ in range(n):
+        try:
+            throttle.call(save)
+            ok += 1
+        except Exception:
+            pass
+    return ok, time.monotonic() - t0, throttle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed put_throttle vs adaptive write throttle against a lagging stub wiki")
+    parser.add_argument('--edits', type=int, default=20, help='edits per strategy (default: %(default)s)')
+    parser.add_argument('--writedelay', type=float, default=10.0,
+                        help="the site's put_throttle, i.e. the old fixed pace (default: %(default)s, pywikibot's default)")
+    parser.add_argument('--pwb-retries', type=int, default=15,
+                        help="pywikibot's internal retries before Page.save raises (default: %(default)s)")
+    parser.add_argument('--base-latency', type=float, default=0.3, help='seconds per save (default: %(default)s)')
+    parser.add_argument('--soft-limit', type=int, default=4, help='edits/s before the stub slows down')
+    parser.add_argument('--hard-limit', type=int, default=8, help='edits/s before the stub answers 429')
+    parser.add_argument('--lag-step', type=float, default=0.15, help='extra seconds per edit over the soft limit')
+    parser.add_argument('--spike-every', type=float, default=8.0, help='seconds between maxlag spikes (0 = none)')
+    parser.add_argument('--spike-length', type=float, default=1.0, help='length of each maxlag spike')
+    write_throttle.add_arguments(parser)
+    args = parser.parse_args()
+    write_throttle.configure(args)
+
+    print(f"{'strategy':<10} {'ok':>4} {'seconds':>8} {'edits/min':>10} {'429':>5} {'maxlag':>7} "
+          f"{'retries':>8} {'backoff s':>10} {'floor s':>8}")
+    for name in ('fixed', 'adaptive'):
+        wiki = StubWiki(args.base_latency, args.soft_limit, args.hard_limit, args.lag_step,
+                        args.spike_every, args.spike_length)
+        server = serve(wiki)
+        url = f"http://127.0.0.1:{server.server_address[1]}/w/api.php"
+        site = StubSite(args.writedelay)
+        save = make_pwb_save(url, site, args.pwb_retries)
+        try:
+            if name == 'fixed':
+                ok, elapsed, throttle = run_fixed(save, args.edits)
+            else:
+                ok, elapsed, throttle = run_adaptive(save, site, args.edits)
+        finally:
+            server.shutdown()
+        retries = f"{throttle.retries:8d}" if throttle else '       -'
+        backoff = f"{throttle.total_backoff:10.1f}" if throttle else '         -'
+        print(f"{name:<10} {ok:>4} {elapsed:>8.1f} {ok * 60 / elapsed:>10.1f} "
+              f"{wiki.counts['ratelimited']:>5} {wiki.counts['maxlag']:>7} {retries} {backoff} "
+              f"{site.throttle.writedelay:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+wikitext 处理函数的基准测试（完全离线，不登录 pywikibot、不连 Gradio）。
+
+对合成语料（benchmarks/corpus.py）测量每次调用的耗时与吞吐量，并与
+benchmarks/baseline.json 对比；比基线慢超过 --tolerance 的用例标记为 REGRESSION，
+此时退出码为 1。修改这些函数后运行一次即可发现性能回退。
+
+用法：
+    python benchmarks/bench_wikitext.py                 # 运行并与基线对比
+    python benchmarks/bench_wikitext.py --save-baseline # 在参考机器上重写基线
+    python benchmarks/bench_wikitext.py -k gallery      # 只跑名字包含 gallery 的用例
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('PYWIKIBOT_NO_USER_CONFIG', '2')
+
+import corpus  # noqa: E402
+import autogen_filesource  # noqa: E402
+import episode_create  # noqa: E402
+import file_cleanup  # noqa: E402
+import season_dataset  # noqa: E402
+import still_gallery_move  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def build_cases():
+    """返回 [(name, fn, [args, ...], input_bytes)]；input_bytes 用于计算 MB/s（不适用时为 0）。"""
+    descs = corpus.file_descriptions()
+    gallery = corpus.gallery_page()
+    headers = corpus.many_headers_page()
+    titles = corpus.file_titles()
+    betweens = corpus.between_texts()
+    episodes, pgp = corpus.season_episodes()
+    dataset = season_dataset.SeasonDataset.build('Martial World Rescue', 'MWR', {'episodes': episodes}, pgp)
+    new_files = [f"File:New still {i}.jpg" for i in range(20)]
+    fi = "{{fi|s={{ep|MWR|1}}|sflag=WeslieSearch-Vision}}"
+
+    def size(texts):
+        return sum(len(t.encode('utf-8')) for t in texts)
+
+    desc_texts = [text for _, text in descs]
+
+    def create_page_content(episode):
+        return episode_create.create_page_content('MWR', 'Martial World Rescue', episode)
+
+    return [
+        ('split_headers/file-descriptions', file_cleanup.split_headers,
+         [(t,) for t in desc_texts], size(desc_texts)),
+        ('split_headers/gallery-5000-lines', file_cleanup.split_headers,
+         [(gallery,)], size([gallery])),
+        ('split_headers/many-headers', file_cleanup.split_headers,
+         [(headers,)], size([headers])),
+        ('extract_section_block/file-descriptions', file_cleanup.extract_section_block_from_text,
+         [(t, 'summary') for t in desc_texts], size(desc_texts)),
+        ('extract_section_block/many-headers', file_cleanup.extract_section_block_from_text,
+         [(headers, 'summary')], size([headers])),
+        ('classify_page/file-descriptions', file_cleanup.classify_page,
+         descs, size(desc_texts)),
+        ('parse_title/titles', file_cleanup.parse_title,
+         [(t,) for t in titles], 0),
+        ('normalize_spaces_between_sections', file_cleanup.normalize_spaces_between_sections,
+         [(b,) for b in betweens], 0),
+        ('replace_or_insert_summary/file-descriptions', autogen_filesource.replace_or_insert_summary_simple,
+         [(t, fi) for t in desc_texts], size(desc_texts)),
+        ('replace_or_insert_summary/many-headers', autogen_filesource.replace_or_insert_summary_simple,
+         [(headers, fi)], size([headers])),
+        ('merge_into_gallery/gallery-5000-lines', still_gallery_move.merge_into_gallery,
+         [(gallery, new_files)], size([gallery])),
+        ('merge_into_gallery/no-gallery', still_gallery_move.merge_into_gallery,
+         [(headers, new_files)], size([headers])),
+        ('to_ordinal/1-999', season_dataset.to_ordinal,
+         [(n,) for n in range(1, 1000)], 0),
+        ('create_page_content/104-episodes', create_page_content,
+         [(ep,) for ep in dataset], 0),
+    ]
+
+
+def run_case(fn, calls, repeat, min_time):
+    """预热一次，然后重复 repeat 轮（每轮至少 min_time 秒），返回每次调用耗时（秒）的列表。"""
+    for args in calls:
+        fn(*args)
+    samples = []
+    for _ in range(repeat):
+        n = 0
+        t0 = time.perf_counter()
+        while True:
+            for args in calls:
+                fn(*args)
+            n += len(calls)
+            elapsed = time.perf_counter() - t0
+            if elapsed >= min_time:
+                break
+        samples.append(elapsed / n)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the wikitext transformation functions (offline)")
+    parser.add_argument('-k', '--filter', default='', help='only run cases whose name contains this string')
+    parser.add_argument('--repeat', type=int, default=5, help='timing rounds per case (default: %(default)s)')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='minimum seconds per round (default: %(default)s)')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown vs baseline before flagging (default: %(default)s = 25%%)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON (default: benchmarks/baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    args = parser.parse_args()
+
+    cases = build_cases()
+    # create_page_content 读取模块级配置
+    episode_create.add_conjectural = True
+    episode_create.add_watch = True
+
+    baseline = {}
+    if os.path.isfile(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('cases', {})
+
+    results = {}
+    regressions = []
+    print(f"{'case':<46} {'per call':>12} {'calls/s':>12} {'MB/s':>9}  vs baseline")
+    for name, fn, calls, input_bytes in cases:
+        if args.filter not in name:
+            continue
+        samples = run_case(fn, calls, args.repeat, args.min_time)
+        per_call = statistics.median(samples)
+        mb_s = input_bytes / len(calls) / per_call / 1e6 if input_bytes else None
+        results[name] = {
+            'per_call_us': round(per_call * 1e6, 3),
+            'best_us': round(min(samples) * 1e6, 3),
+            'calls_per_s': round(1 / per_call, 1),
+            'mb_per_s': round(mb_s, 2) if mb_s else None,
+            'calls_per_round': len(calls),
+        }
+
+        note = ''
+        if name in baseline:
+            ratio = per_call * 1e6 / baseline[name]['per_call_us']
+            note = f"{ratio:5.2f}x"
+            if ratio > 1 + args.tolerance:
+                note += '  REGRESSION'
+                regressions.append(name)
+        print(f"{name:<46} {per_call * 1e6:10.2f}us {1 / per_call:12.0f} "
+              f"{(f'{mb_s:9.1f}' if mb_s else '        -')}  {note}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': sys.version.split()[0],
+                'platform': sys.platform,
+                'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'cases': results,
+            }, f, indent=1, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
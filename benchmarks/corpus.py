@@ -0,0 +1,121 @@
+"""
+基准测试用的合成语料（固定随机种子，每次生成的内容相同）。
+
+覆盖几类常见形态：
+- 小型文件描述页（CASE A–D、额外段落、空描述等）
+- 5000 行左右的剧集 Gallery 页
+- 含大量 header 的长页面
+- File 标题列表（parse_title）与剧集数据（create_page_content）
+"""
+import random
+
+import season_registry
+
+SEED = 20240601
+
+LICENSES = ['Fairuse', 'Fairuse-screenshot', 'Cc-by-sa-4.0', 'PD', 'Self', 'Permission']
+
+
+def _words(rng, n):
+    vocab = ['Weslie', 'Wolffy', 'Paddi', 'Sparky', 'Jonie', 'Tibbie', 'Slowy', 'Wolnie',
+             'screenshot', 'episode', 'still', 'from', 'the', 'of', 'and', 'in', 'title', 'card']
+    return ' '.join(rng.choice(vocab) for _ in range(n))
+
+
+def file_descriptions(n=2000, seed=SEED):
+    """小型文件描述页，各种结构按大致比例混合。返回 [(title, text)]。"""
+    rng = random.Random(seed)
+    codes = season_registry.SEASON_CODES
+    pages = []
+    for i in range(n):
+        code = rng.choice(codes)
+        title = f"File:{code.upper()}{rng.randint(1, 104):02d}.png" if rng.random() < 0.6 else f"File:Still {i}.jpg"
+        lic = f"{{{{{rng.choice(LICENSES)}}}}}"
+        shape = rng.random()
+        if shape < 0.45:    # 合规
+            text = f"== Summary ==\n{{{{fi|d={_words(rng, 8)}|s={{{{ep|{code}|{rng.randint(1, 60)}}}}}}}}}\n\n== Licensing ==\n{lic}\n"
+        elif shape < 0.6:   # 只有 Licensing
+            text = f"== Licensing ==\n{lic}\n"
+        elif shape < 0.72:  # 没有 header
+            text = _words(rng, 20) + "\n"
+        elif shape < 0.82:  # 前导文本 + Licensing
+            text = _words(rng, 15) + f"\n== Licensing ==\n{lic}\n"
+        elif shape < 0.92:  # 额外段落
+            text = (f"== Summary ==\n{_words(rng, 10)}\n== Source ==\n{_words(rng, 5)}\n"
+                    f"== Licensing ==\n{lic}\n")
+        elif shape < 0.97:  # 模板不合规 / 空行过多
+            text = f"== Summary ==\n\n\n{{{{Information|{_words(rng, 6)}}}}}\n== Licensing ==\n{lic}\n\n"
+        else:
+            text = ''
+        pages.append((title, text))
+    return pages
+
+
+def gallery_page(lines=5000, seed=SEED):
+    """约 lines 行的剧集页面，Gallery 段内有一个很大的 <gallery>，后面还有 Watch / Navigation。"""
+    rng = random.Random(seed)
+    files = '\n'.join(f"File:Gallery still {i}.jpg|{_words(rng, 3)}" for i in range(lines))
+    return (
+        "{{Infobox episode|MWR|1|image=MWR01.png}}\n"
+        "{{EpisodeZ}} is the first episode of [[Martial World Rescue]].\n\n"
+        "==Characters present==\n{{clist}}\n\n"
+        "==Summary==\n" + _words(rng, 200) + "\n\n"
+        "==Gallery==\n<gallery>\n" + files + "\n</gallery>\n\n"
+        "==Watch==\n{{yt|abcdefghijk}}\n\n"
+        "==Navigation==\n{{MWR|uncollapsed}}\n"
+    )
+
+
+def many_headers_page(headers=300, seed=SEED):
+    """含 headers 个（二、三级交替）header 的长页面，Summary 段在中间。"""
+    rng = random.Random(seed)
+    parts = []
+    for i in range(headers):
+        level = '==' if i % 3 else '==='
+        title = 'Summary' if i == headers // 2 else f"Section {i}"
+        parts.append(f"{level} {title} {level}\n{_words(rng, 30)}\n")
+    return '\n'.join(parts)
+
+
+def file_titles(n=5000, seed=SEED):
+    """parse_title 输入：大部分为 <season><number>.png，其余为不匹配的标题。"""
+    rng = random.Random(seed)
+    codes = season_registry.SEASON_CODES
+    titles = []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.7:
+            titles.append(f"File:{rng.choice(codes).upper()}{rng.randint(1, 104):02d}.png")
+        elif r < 0.9:
+            titles.append(f"File:{rng.choice(codes).title()} still {i}.jpg")
+        else:
+            titles.append(f"File:{_words(rng, 3)}.png")
+    return titles
+
+
+def between_texts(n=1000, seed=SEED):
+    """normalize_spaces_between_sections 输入：各种空白 / 注释组合。"""
+    rng = random.Random(seed)
+    samples = ['', '\n', '\n\n', '\n\n\n\n', '  \n \n', '<!-- note -->\n', ' ', '\r\n\r\n', None]
+    return [rng.choice(samples) for _ in range(n)]
+
+
+def season_episodes(n=104, seed=SEED):
+    """Template:Episode/<Season>.json 风格的剧集列表，以及与之对应的 PGP 导出数据。"""
+    rng = random.Random(seed)
+    episodes = []
+    pgp = []
+    for num in range(1, n + 1):
+        ep = {'num': num, 'english': f"{_words(rng, 3).title()} {num}",
+              'chinese': f"第{num}集", 'pinyin': f"di {num} ji"}
+        if num % 17 == 0:
+            ep['suffix'] = 'episode'
+        episodes.append(ep)
+        pgp.append({
+            '集数': num,
+            '页面名': f"页面{num}",
+            '剧情简介（YouTube英文）': _words(rng, 40),
+            '链接（YouTube中文）': f"https://www.youtube.com/watch?v=vid{num:08d}",
+        })
+    rng.shuffle(pgp)
+    return episodes, pgp
@@ -0,0 +1,55 @@
+"""
+本地 WeslieSearch-Vision 替身（需要 gradio）：/submit 接口与线上参数相同，
+等待 --latency 秒（可加随机抖动）后返回固定的结果 tuple，用于离线测试
+autogen_filesource.py 的并发提交、超时与重试。
+
+用法：
+    python benchmarks/stub_gradio_app.py --latency 2 --port 7861
+    python autogen_filesource.py --gradio-url http://127.0.0.1:7861/ --inference-workers 8 --plan stub.plan.jsonl
+    python benchmarks/bench_gradio_jobs.py --gradio-url http://127.0.0.1:7861/
+"""
+import argparse
+import random
+import time
+
+# 与线上返回格式一致：每条结果 6 项，第一条的 season / episode 在最前面
+CANNED_RESULT = ("MWR：Martial World Rescue", "第5集", "00:03:12", "0.93", "", "")
+
+
+def build_app(latency, jitter, fail_rate, concurrency):
+    import gradio as gr
+
+    def submit(img, query_num, season_filter):
+        time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+        if random.random() < fail_rate:
+            raise gr.Error("stub: injected failure")
+        return CANNED_RESULT
+
+    with gr.Blocks() as app:
+        img = gr.Image(type="filepath")
+        query_num = gr.Number(value=1, precision=0)
+        season_filter = gr.Textbox(value="")
+        outputs = [gr.Textbox() for _ in CANNED_RESULT]
+        button = gr.Button("Submit")
+        button.click(submit, inputs=[img, query_num, season_filter], outputs=outputs,
+                     api_name="submit", concurrency_limit=concurrency)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the WeslieSearch-Vision /submit endpoint")
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds per request (default: %(default)s)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="random +/- seconds (default: %(default)s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="fraction of requests that raise an error (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="requests the stub serves at once (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=7861)
+    args = parser.parse_args()
+
+    app = build_app(args.latency, args.jitter, args.fail_rate, args.concurrency)
+    app.queue(default_concurrency_limit=args.concurrency).launch(server_name="127.0.0.1", server_port=args.port)
+
+
+if __name__ == "__main__":
+    main()
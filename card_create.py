@@ -1,5 +1,8 @@
 import pywikibot
 
+from page_state import load_page_states
+from write_throttle import AdaptiveThrottle
+
 def release_date_to_ym(release_date: str) -> str:
     # release_date 格式假设为 "April 2025"
     month_map = {
@@ -16,10 +19,6 @@ def release_date_to_ym(release_date: str) -> str:
         # 如果格式不对，直接返回空或者默认值
         return "000000"
 
-def check_page_exists(site, title):
-    page = pywikibot.Page(site, title)
-    return page.exists()
-
 def create_card_page_content(card_number, rarity, release_date, obtained_text):
     # 格式化卡牌编号，3位数，前导0
     card_num_str = f"{card_number:03d}"
@@ -44,6 +43,7 @@ def create_card_page_content(card_number, rarity, release_date, obtained_text):
 def main():
     site = pywikibot.Site('en', 'xyy')
     site.login()
+    throttle = AdaptiveThrottle.for_site(site)
 
     rarity = "UC"  # 稀有度
     release_date = "April 2025"  # 发行时间，保持和模板中一致的格式
@@ -52,16 +52,22 @@ def main():
     start_num = 1
     end_num = 2
 
-    for num in range(start_num, end_num + 1):
-        page_title = f"Card:XYY-{rarity}-{num:03d} (Auldey {release_date})"
-        if check_page_exists(site, page_title):
+    page_titles = {num: f"Card:XYY-{rarity}-{num:03d} (Auldey {release_date})"
+                   for num in range(start_num, end_num + 1)}
+    # 整套卡牌页面的存在性一次批量查完
+    states = load_page_states(site, page_titles.values())
+
+    for num, page_title in page_titles.items():
+        if states[page_title].exists:
             print(f"Page '{page_title}' already exists, skipping.")
         else:
             print(f"Creating page '{page_title}'...")
             content = create_card_page_content(num, rarity, release_date, obtained_text)
-            page = pywikibot.Page(site, page_title)
+            page = states[page_title].page
             page.text = content
-            page.save(summary=f"Creating card page for {page_title}")
+            throttle.call(page.save, summary=f"Creating card page for {page_title}")
+
+    print(throttle.summary())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,67 @@
+"""
+File 页面合规台账（SQLite）。
+
+记录每个页面最后一次检查时的 revid 与结论（OK / FIXED / MANUAL ...）。
+下一轮遍历只需列出名字空间的 revid 元数据，revid 与台账一致的页面不再取正文。
+"""
+import sqlite3
+import threading
+import time
+
+VERDICT_OK = 'OK'
+VERDICT_FIXED = 'FIXED'
+VERDICT_MANUAL = 'MANUAL'
+
+# 这些结论代表页面已合规（或已由我们修复），revid 不变就无需再检查
+SETTLED_VERDICTS = {VERDICT_OK, VERDICT_FIXED}
+
+
+class ComplianceLedger:
+    def __init__(self, path):
+        self.path = path
+        # 流水线模式下列表线程与写入线程都会访问台账，用一把锁串行化
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS ledger ('
+            ' title TEXT PRIMARY KEY,'
+            ' revid INTEGER NOT NULL,'
+            ' verdict TEXT NOT NULL,'
+            ' checked_at TEXT NOT NULL)'
+        )
+        self.conn.commit()
+        self._pending = 0
+
+    def get(self, title):
+        """返回 (revid, verdict) 或 None。"""
+        with self._lock:
+            row = self.conn.execute('SELECT revid, verdict FROM ledger WHERE title = ?', (title,)).fetchone()
+        return tuple(row) if row else None
+
+    def is_settled(self, title, revid):
+        """页面最新 revid 与台账一致且上次结论为合规/已修复时返回 True。"""
+        entry = self.get(title)
+        return entry is not None and entry[0] == revid and entry[1] in SETTLED_VERDICTS
+
+    def record(self, title, revid, verdict, commit_every=100):
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO ledger (title, revid, verdict, checked_at) VALUES (?, ?, ?, ?)',
+                (title, revid, verdict, time.strftime('%Y-%m-%dT%H:%M:%S'))
+            )
+            self._pending += 1
+        if self._pending >= commit_every:
+            self.commit()
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+            self._pending = 0
+
+    def counts(self):
+        with self._lock:
+            return dict(self.conn.execute('SELECT verdict, COUNT(*) FROM ledger GROUP BY verdict').fetchall())
+
+    def close(self):
+        self.commit()
+        self.conn.close()
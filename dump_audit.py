@@ -0,0 +1,141 @@
+"""
+离线审计：对 MediaWiki XML dump（pages-articles，可为 .bz2 / .gz）中的 File 页面执行
+file_cleanup.py 的同一套判断（classify_page），不发任何 API 请求。
+
+dump 用 iterparse 流式读取，每处理完一个 <page> 就释放，内存占用恒定。
+输出每类页面的数量、标题列表，以及自动修复类页面预先算好的替换文本。
+
+用法：
+    python dump_audit.py xyy-pages-articles.xml.bz2 [-o file_audit.json]
+"""
+import argparse
+import bz2
+import gzip
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict
+
+# 只用到 file_cleanup 的纯文本函数，不需要 user-config.py
+os.environ.setdefault('PYWIKIBOT_NO_USER_CONFIG', '2')
+
+from file_cleanup import (  # noqa: E402
+    ALLOWED_LICENSE_TEMPLATES, ALLOWED_SUMMARY_TEMPLATES, CASE_UNUSUAL, FILE_NS,
+    classify_page, section_is_single_template_whole,
+)
+from wikitext_sections import SectionIndex  # noqa: E402
+
+
+def open_dump(path):
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _local(tag):
+    """去掉 {http://www.mediawiki.org/xml/export-0.xx/} 命名空间前缀。"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_dump_pages(path, namespace=FILE_NS):
+    """
+    流式产出 (title, text)，只包含指定名字空间的页面；每页取最后一个 revision 的正文。
+    """
+    with open_dump(path) as f:
+        context = ET.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        for event, elem in context:
+            if event != 'end' or _local(elem.tag) != 'page':
+                continue
+            title = ns = text = None
+            for child in elem:
+                name = _local(child.tag)
+                if name == 'title':
+                    title = child.text
+                elif name == 'ns':
+                    ns = int(child.text)
+                elif name == 'revision':
+                    for rev_child in child:
+                        if _local(rev_child.tag) == 'text':
+                            text = rev_child.text or ''
+            if ns == namespace and title is not None:
+                yield title, text or ''
+            # 释放已处理的 <page>，保持内存恒定
+            elem.clear()
+            root.clear()
+
+
+def noncompliance_reasons(text):
+    """对 unusual 类页面给出更具体的原因（模板不合规 / 空行过多 / 缺段落）。"""
+    index = SectionIndex(text)
+    reasons = []
+    for key, allowed in (('summary', ALLOWED_SUMMARY_TEMPLATES), ('licensing', ALLOWED_LICENSE_TEMPLATES)):
+        block = index.block(key)
+        if block is None:
+            reasons.append(f"missing {key}")
+            continue
+        ok, name = section_is_single_template_whole(block, allowed)
+        if not ok:
+            reasons.append(f"{key} template not allowed: {name}" if name else f"{key} is not a single template")
+        if block.startswith('\n\n'):
+            reasons.append(f"extra blank lines under {key}")
+    if index.leading.strip():
+        reasons.append("leading text before first header")
+    return reasons or ["trailing blank lines after licensing"]
+
+
+def audit_dump(path, namespace=FILE_NS):
+    counts = Counter()
+    titles = defaultdict(list)
+    fixes = {}
+    unusual = {}
+    for title, text in iter_dump_pages(path, namespace):
+        verdict = classify_page(title, text)
+        counts[verdict.case] += 1
+        titles[verdict.case].append(title)
+        if verdict.new_text is not None:
+            fixes[title] = {
+                'case': verdict.case,
+                'action': verdict.action,
+                'summary': verdict.summary,
+                'new_text': verdict.new_text,
+            }
+        if verdict.case == CASE_UNUSUAL:
+            unusual[title] = noncompliance_reasons(text)
+    return {
+        'dump': os.path.abspath(path),
+        'namespace': namespace,
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'counts': dict(counts),
+        'titles': dict(titles),
+        'unusual_reasons': unusual,
+        'fixes': fixes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline file-description audit from an XML dump")
+    parser.add_argument("dump", help="pages-articles XML dump (.xml / .xml.bz2 / .xml.gz)")
+    parser.add_argument("-o", "--output", default="file_audit.json", help="Report path (default: %(default)s)")
+    parser.add_argument("--namespace", type=int, default=FILE_NS, help="Namespace to audit (default: %(default)s)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    report = audit_dump(args.dump, args.namespace)
+    elapsed = time.perf_counter() - t0
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+    total = sum(report['counts'].values())
+    print(f"Audited {total} pages in {elapsed:.1f}s")
+    for case, n in sorted(report['counts'].items(), key=lambda kv: -kv[1]):
+        print(f"  {case:<16} {n}")
+    print(f"{len(report['fixes'])} automatic fixes precomputed; report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
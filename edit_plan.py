@@ -0,0 +1,215 @@
+"""
+编辑计划文件（plan / review / apply 三步）。
+
+1. plan：脚本照常遍历和计算，但不保存、不询问，只把每个拟议编辑
+   （标题、基准 revid、旧文本及其 sha1、新文本、编辑摘要）写进计划文件（JSONL）；
+2. review：离线逐条翻看 diff，批准或拒绝（可随时退出，进度写回计划文件）；
+3. apply：非交互地保存所有已批准的编辑；保存前才重新检查，页面 revid 或正文 sha1 与计划时
+   不同的一律拒绝（conflict），保存时带 baserevid 让服务器检测之后发生的编辑冲突。
+"""
+import difflib
+import hashlib
+import json
+import os
+import time
+
+import pywikibot
+
+from write_throttle import AdaptiveThrottle
+
+STATUS_PENDING = 'pending'
+STATUS_APPROVED = 'approved'
+STATUS_REJECTED = 'rejected'
+STATUS_APPLIED = 'applied'
+STATUS_CONFLICT = 'conflict'
+STATUS_FAILED = 'failed'
+
+
+def text_sha1(text):
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()
+
+
+def add_arguments(parser):
+    """给脚本的 argparse 加上 --plan / --review-plan / --apply。"""
+    parser.add_argument("--plan", metavar="PATH",
+                        help="Write every proposed edit to this plan file instead of prompting/saving")
+    parser.add_argument("--review-plan", metavar="PATH",
+                        help="Page through the diffs of a plan file and approve/reject them (offline)")
+    parser.add_argument("--apply", metavar="PATH",
+                        help="Save all approved edits of a plan file; pages edited since planning are refused")
+
+
+class PlanWriter:
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+
+    def add(self, page, old_text, new_text, summary):
+        """记录一条拟议编辑；page 需已加载（用于取基准 revid）。"""
+        record = {
+            'title': page.title(),
+            'base_revid': page.latest_revision_id if page.exists() else None,
+            'old_sha1': text_sha1(old_text),
+            'old_text': old_text,
+            'new_text': new_text,
+            'summary': summary,
+            'status': STATUS_PENDING,
+            'planned_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.count += 1
+        print(f"[PLANNED] {record['title']}")
+
+
+def load_plan(path):
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    return records
+
+
+def save_plan(path, records):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, path)
+
+
+def _status_counts(records):
+    counts = {}
+    for rec in records:
+        counts[rec['status']] = counts.get(rec['status'], 0) + 1
+    return ', '.join(f"{k}={v}" for k, v in sorted(counts.items()))
+
+
+def show_diff(rec, context=3, max_lines=80):
+    diff = list(difflib.unified_diff(
+        (rec.get('old_text') or '').splitlines(),
+        (rec.get('new_text') or '').splitlines(),
+        fromfile=f"{rec['title']} (r{rec.get('base_revid')})",
+        tofile=f"{rec['title']} (planned)",
+        n=context, lineterm=''
+    ))
+    print('\n'.join(diff[:max_lines]))
+    if len(diff) > max_lines:
+        print(f"... ({len(diff) - max_lines} more diff lines)")
+
+
+def review_plan(path):
+    """
+    逐条显示待审编辑的 diff：y 批准 / n 拒绝 / s 跳过 / a 批准剩余全部 / q 保存并退出。
+    不访问 wiki。
+    """
+    records = load_plan(path)
+    pending = [rec for rec in records if rec['status'] == STATUS_PENDING]
+    print(f"{len(pending)} pending edit(s) in {path} ({_status_counts(records)})")
+    try:
+        for n, rec in enumerate(pending):
+            print(f"\n=== [{n + 1}/{len(pending)}] {rec['title']} — {rec['summary']}")
+            show_diff(rec)
+            while True:
+                choice = input("Approve? (y/n/s=skip/a=approve all remaining/q=quit): ").strip().lower()
+                if choice in ('y', 'n', 's', 'a', 'q'):
+                    break
+            if choice == 'q':
+                break
+            if choice == 'a':
+                for rest in pending[n:]:
+                    rest['status'] = STATUS_APPROVED
+                break
+            if choice == 'y':
+                rec['status'] = STATUS_APPROVED
+            elif choice == 'n':
+                rec['status'] = STATUS_REJECTED
+    finally:
+        save_plan(path, records)
+        print(f"Plan saved: {_status_counts(records)}")
+
+
+# apply 时每次重新取多少个页面的当前状态；取完马上保存这一批，检查与保存之间的间隔只有几次写入
+APPLY_RECHECK_SIZE = 10
+
+
+def _is_edit_conflict(exc):
+    """保存时服务器报告的编辑冲突（pywikibot 可能把它包在 OtherPageSaveError.reason 里）。"""
+    for cause in (exc, getattr(exc, 'reason', None), exc.__cause__):
+        if isinstance(cause, pywikibot.exceptions.EditConflictError) or getattr(cause, 'code', None) == 'editconflict':
+            return True
+    return False
+
+
+def apply_plan(site, path, batch_size=50, throttle=None):
+    """
+    保存计划中所有已批准的编辑，不做任何交互。
+    每 min(batch_size, APPLY_RECHECK_SIZE) 个页面为一批：保存这一批之前才批量取回当前 revid 与正文，
+    revid 与计划时的 base_revid 不同、或正文 sha1 与 old_sha1 不同的页面标记为 conflict 并跳过；
+    保存时带上 baserevid，检查之后才发生的编辑由服务器按编辑冲突处理，同样记为 conflict。
+    保存节奏由 throttle（AdaptiveThrottle，默认新建一个）控制。
+    """
+    records = load_plan(path)
+    approved = [rec for rec in records if rec['status'] == STATUS_APPROVED]
+    if not approved:
+        print(f"No approved edits in {path} ({_status_counts(records)})")
+        return
+
+    if throttle is None:
+        throttle = AdaptiveThrottle.for_site(site)
+    chunk_size = max(1, min(batch_size, APPLY_RECHECK_SIZE))
+
+    try:
+        for i in range(0, len(approved), chunk_size):
+            chunk = approved[i:i + chunk_size]
+            pages = [pywikibot.Page(site, rec['title']) for rec in chunk]
+            try:
+                list(site.preloadpages(pages, groupsize=chunk_size, content=True))
+            except Exception as e:
+                for rec in chunk:
+                    rec['status'] = STATUS_FAILED
+                    rec['error'] = f"recheck failed: {e}"
+                    print(f"[FAILED] {rec['title']} — recheck failed: {e}")
+                continue
+
+            for rec, page in zip(chunk, pages):
+                try:
+                    exists = page.exists()
+                    current = page.latest_revision_id if exists else None
+                    if current != rec['base_revid']:
+                        rec['status'] = STATUS_CONFLICT
+                        print(f"[CONFLICT] {rec['title']} — r{rec['base_revid']} planned, now r{current}; refused.")
+                        continue
+                    if rec.get('old_sha1') and text_sha1(page.text if exists else '') != rec['old_sha1']:
+                        rec['status'] = STATUS_CONFLICT
+                        print(f"[CONFLICT] {rec['title']} — text differs from the planned base; refused.")
+                        continue
+                    page.text = rec['new_text']
+                    kwargs = {'baserevid': rec['base_revid']} if rec['base_revid'] else {'createonly': True}
+                    throttle.call(page.save, summary=rec['summary'], **kwargs)
+                    rec['status'] = STATUS_APPLIED
+                    rec['applied_revid'] = page.latest_revision_id
+                    print(f"[APPLIED] {rec['title']}")
+                except Exception as e:
+                    rec['status'] = STATUS_CONFLICT if _is_edit_conflict(e) else STATUS_FAILED
+                    rec['error'] = str(e)
+                    print(f"[{rec['status'].upper()}] {rec['title']} — {e}")
+    finally:
+        save_plan(path, records)
+        print(f"Plan saved: {_status_counts(records)}")
+        print(throttle.summary())
+
+
+def run_plan_command(args, get_site, batch_size=50):
+    """
+    处理 --review-plan / --apply；处理了返回 True（脚本应直接结束），否则返回 False。
+    get_site: 返回已登录 site 的函数（只有 --apply 需要登录）。
+    """
+    if args.review_plan:
+        review_plan(args.review_plan)
+        return True
+    if args.apply:
+        apply_plan(get_site(), args.apply, batch_size=batch_size)
+        return True
+    return False
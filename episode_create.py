@@ -1,117 +1,45 @@
-import pywikibot
-import requests
-import re
+import argparse
 import json
 import os
-from urllib.parse import urlparse, parse_qs
-
-
-local_json_data = None
-
+import time
+from collections import namedtuple
 
-def to_ordinal(n):
-    ones = ['', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine']
-    firsts = ['', 'first', 'second', 'third', 'fourth', 'fifth', 'sixth', 'seventh', 'eighth', 'ninth']
-    teens = ['tenth', 'eleventh', 'twelfth', 'thirteenth', 'fourteenth', 'fifteenth', 'sixteenth', 'seventeenth', 'eighteenth', 'nineteenth']
-    tens = ['', '', 'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety']
-    tenths = ['', '', 'twentieth', 'thirtieth', 'fortieth', 'fiftieth', 'sixtieth', 'seventieth', 'eightieth', 'ninetieth']
+import pywikibot
 
-    res = ''
-    if n >= 100:
-        res += ones[n // 100] + ' hundred'
-        n %= 100
-    if n == 0:
-        res += 'th'
-        return res
-    else:
-        res += ' and ' if res else ''
-    if n >= 20:
-        if n % 10 == 0:
-            res += tenths[n // 10]
-        else:
-            res += tens[n // 10] + '-' + firsts[n % 10]
-    elif n >= 10:
-        res += teens[n - 10]
-    else:
-        res += firsts[n]
-    return res
-
-
-def fetch_json_data(season_name):
-    api_url = "https://xyy.miraheze.org/w/api.php"
-    params = {
-        "action": "parse",
-        "page": f"Template:Episode/{season_name.replace(' ', '_')}.json",
-        "prop": "wikitext",
-        "formatversion": "2",
-        "format": "json",
-        "origin": "*"
-    }
-    headers = {
-        "User-Agent": "Mozilla/5.0"
-    }
-    response = requests.get(api_url, params=params, headers=headers)
-    if response.status_code == 200:
-        data = response.json()
-        if "parse" in data and "wikitext" in data["parse"]:
-            return json.loads(data["parse"]["wikitext"])
-        else:
-            raise Exception(f"Unexpected API response: {data}")
-    else:
-        raise Exception(f"Failed to fetch JSON data: {response.status_code}")
+import season_registry
+from episode_json import EpisodeJsonCache
+from page_rating import RatingQueue
+from page_state import load_page_states
+from season_dataset import SeasonDataset
+import write_throttle
+from write_throttle import AdaptiveThrottle
 
 
-def check_page_exists(site, title):
-    page = pywikibot.Page(site, title)
-    return page.exists()
+# create_page_content() 未显式传入 conjectural / watch 时使用的默认值
+add_conjectural = False
+add_watch = False
 
+# 一季的创建任务；pgp_path 为 PGP 导出 JSON 的路径（可为 None）
+SeasonJob = namedtuple('SeasonJob', ['name', 'abbr', 'conjectural', 'watch', 'pgp_path'])
 
-def extract_youtube_id(url):
-    try:
-        if "youtu.be/" in url:
-            return url.split("youtu.be/")[1].split("?")[0]
-        if "youtube.com/watch" in url:
-            query = parse_qs(urlparse(url).query)
-            return query.get("v", [None])[0]
-    except Exception:
-        return None
-    return None
-
-
-def create_page_content(season_abbr, season_name, episode):
-    global local_json_data
-
-    ordinal_num = to_ordinal(episode['num'])
-    english_title = episode['english']
-    chinese_title = episode['chinese']
-    pinyin_title = episode['pinyin']
-
-    zh_page_name = chinese_title
-    summary_en = None
-    yt_id = None
-
-    if local_json_data:
-        for ep in local_json_data:
-            if ep.get("集数") == episode['num']:
-                if ep.get("页面名"):
-                    zh_page_name = ep["页面名"]
-                if ep.get("剧情简介（YouTube英文）"):
-                    summary_en = ep["剧情简介（YouTube英文）"]
-                if ep.get("链接（YouTube中文）"):
-                    yt_id = extract_youtube_id(ep["链接（YouTube中文）"])
-                break
 
+def create_page_content(season_abbr, season_name, episode, conjectural=None, watch=None):
+    """episode 为 season_dataset.EpisodeRecord（已合并 PGP 数据）。"""
+    if conjectural is None:
+        conjectural = add_conjectural
+    if watch is None:
+        watch = add_watch
     page_content = ''
 
-    if add_conjectural:
+    if conjectural:
         page_content += f"{{{{Conjectural}}}}\n"
 
-    page_content += f"""{{{{Infobox episode|{season_abbr}|{episode['num']}|image={season_abbr}{episode['num']:02d}.png}}}}
-{{{{EpisodeZ}}}} is the {ordinal_num} episode of [[{season_name}]].
+    page_content += f"""{{{{Infobox episode|{season_abbr}|{episode.num}|image={season_abbr}{episode.num:02d}.png}}}}
+{{{{EpisodeZ}}}} is the {episode.ordinal} episode of [[{season_name}]].
 """
 
-    if summary_en:
-        page_content += f"\n{summary_en}\n"
+    if episode.summary_en:
+        page_content += f"\n{episode.summary_en}\n"
 
     page_content += """
 ==Characters present==
@@ -121,91 +49,207 @@ def create_page_content(season_abbr, season_name, episode):
 {{TBA}}
 """
 
-    if add_watch:
+    if watch:
         page_content += "\n==Watch==\n"
-        if yt_id:
-            page_content += f"{{{{yt|{yt_id}}}}}\n"
+        if episode.yt_id:
+            page_content += f"{{{{yt|{episode.yt_id}}}}}\n"
         else:
             page_content += "{{yt|}}\n"
 
     page_content += f"""
 ==Navigation==
-{{{{{season_abbr[:-1] if season_abbr[-1].isdigit() else season_abbr}|uncollapsed}}}}
-[[zh:{zh_page_name}]]
+{{{{{season_registry.navigation_template(season_abbr)}|uncollapsed}}}}
+[[zh:{episode.zh_page_name}]]
 """
 
     return page_content
 
 
-def process_season(season_name, season_abbr, add_conjectural, add_watch):
-    try:
-        data = fetch_json_data(season_name)
-    except Exception as e:
-        print(f"Error fetching JSON data: {e}")
-        return
+def print_report(rows, ratings, elapsed, failed_seasons=()):
+    """
+    rows: [(season_abbr, title, 创建结果)]；评级结果从 ratings 中查。
+    failed_seasons: [(season_abbr, 错误信息)]，中途出错而没有处理完的季。
+    """
+    width = max([len(title) for _, title, _ in rows] + [len('Title')])
+    print(f"\n{'Season':<8}  {'Title':<{width}}  {'Create':<8}  Rating")
+    for season_abbr, title, created in rows:
+        if created != 'created':
+            rating = '-'
+        elif title in ratings.failed:
+            rating = f"failed ({ratings.failed[title]})"
+        else:
+            rating = 'rated'
+        print(f"{season_abbr:<8}  {title:<{width}}  {created:<8}  {rating}")
+    counts = {c: sum(1 for *_, created in rows if created == c) for c in ('created', 'exists', 'failed')}
+    print(f"Created: {counts['created']}, already existed: {counts['exists']}, create failed: {counts['failed']}; "
+          f"rated: {len(ratings.rated)}, rating failed: {len(ratings.failed)}; "
+          f"wall time: {elapsed:.1f}s")
+    for season_abbr, error in failed_seasons:
+        print(f"[Season failed] {season_abbr}: {error}")
+
+
+def _manifest_flag(path, i, entry, key):
+    """清单里的开关只接受 true / false（"false" 之类的字符串会被当成真，直接报错）。"""
+    value = entry.get(key, False)
+    if not isinstance(value, bool):
+        raise ValueError(f"{path}: season #{i + 1} ({entry['abbr']}): '{key}' must be true or false, got {value!r}")
+    return value
+
+
+def load_manifest(path):
+    """
+    读取清单（.yaml / .yml 需要 PyYAML，其余按 JSON）：季度列表，或 {"seasons": [...]}。
+    每项：name、abbr 必填；conjectural、watch 为布尔值，默认 false；pgp 为 PGP 导出 JSON 路径，
+    相对路径以清单所在目录为基准。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('seasons')
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of seasons (or a 'seasons' key)")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for i, entry in enumerate(data):
+        if not isinstance(entry, dict) or not entry.get('name') or not entry.get('abbr'):
+            raise ValueError(f"{path}: season #{i + 1} needs 'name' and 'abbr'")
+        pgp_path = entry.get('pgp')
+        if pgp_path:
+            pgp_path = os.path.join(base_dir, os.path.expanduser(pgp_path))
+        jobs.append(SeasonJob(
+            name=entry['name'],
+            abbr=entry['abbr'],
+            conjectural=_manifest_flag(path, i, entry, 'conjectural'),
+            watch=_manifest_flag(path, i, entry, 'watch'),
+            pgp_path=pgp_path or None,
+        ))
+    return jobs
+
+
+def process_season(site, throttle, ratings, job, rows, json_cache=None):
+    """
+    创建一季的剧集页面，新建的页面交给 ratings 评级；每页结果 (abbr, title, 创建结果) 追加到 rows，
+    中途出错时已处理的页面仍留在 rows 中。
+    """
+    print(f"\n=== {job.name} ({job.abbr}) ===")
+    dataset = SeasonDataset.for_season(job.name, job.abbr, job.pgp_path, json_cache=json_cache)
+
+    # 所有剧集页面的存在性一次批量查完
+    states = load_page_states(site, [episode.page_title for episode in dataset])
+
+    for episode in dataset:
+        episode_title = episode.page_title
+        if states[episode_title].exists:
+            print(f"Page '{episode_title}' already exists.")
+            rows.append((job.abbr, episode_title, 'exists'))
+            continue
+        print(f"Creating page for '{episode_title}'...")
+        page_content = create_page_content(job.abbr, job.name, episode, job.conjectural, job.watch)
+        page = states[episode_title].page
+        page.text = page_content
+        try:
+            throttle.call(page.save, summary=f"Creating episode page for {episode_title}")
+        except Exception as e:
+            print(f"Failed to create {episode_title}: {e}")
+            rows.append((job.abbr, episode_title, 'failed'))
+            continue
+        rows.append((job.abbr, episode_title, 'created'))
+        ratings.put(episode_title)
+
 
+def run(jobs):
+    """所有季共用一次登录、一个写入节流与一个评级队列；一季出错不影响其余的季。"""
+    started = time.monotonic()
     site = pywikibot.Site('en', 'xyy')
     site.login()
-    token = site.tokens['csrf']
+    throttle = AdaptiveThrottle.for_site(site)
+    json_cache = EpisodeJsonCache()
 
-    for episode in data['episodes']:
-        episode_title = episode['english']
-        if 'suffix' in episode:
-            episode_title += f" ({episode['suffix']})"
-
-        if check_page_exists(site, episode_title):
-            print(f"Page '{episode_title}' already exists.")
-        else:
-            print(f"Creating page for '{episode_title}'...")
-            page_content = create_page_content(season_abbr, season_name, episode)
-            page = pywikibot.Page(site, episode_title)
-            page.text = page_content
-            page.save(summary=f"Creating episode page for {episode_title}")
-
-            # 创建后立刻评级为 ST
-            params = {
-                'action': 'change-rating',
-                'format': 'json',
-                'title': episode_title,
-                'rating-to': 'ST',
-                'reason': "Auto rate new episode page",
-                'token': token
-            }
+    # 新建的页面评级为 ST；评级在后台线程进行，不阻塞下一页的创建
+    ratings = RatingQueue(site, 'ST', "Auto rate new episode page", throttle)
+    rows = []
+    failed_seasons = []
+    try:
+        # 所有季的 JSON 一次取回（一个 revid 查询 + 一个内容请求），process_season 里直接使用；
+        # 失败时由各季自己再取，错误记在对应的季下
+        try:
+            json_cache.load([job.name for job in jobs], skip_missing=True)
+        except Exception as e:
+            print(f"Failed to prefetch episode JSON: {e}")
+        for job in jobs:
             try:
-                result = site.simple_request(**params).submit()
-                print(f"Rated {episode_title} -> {'ST'}: {result}")
+                process_season(site, throttle, ratings, job, rows, json_cache)
             except Exception as e:
-                print(f"Failed to rate {episode_title}: {e}")
-
-
-season_name = input("Enter the season name (e.g., Marching to the New Wonderland): ")
-season_abbr = input("Enter the season abbreviation (e.g., MttNW): ")
-add_conjectural = input("Do you want to add {{Conjectural}} template? (y/n): ").strip().lower() == 'y'
-add_watch = input("Do you want to add the Watch section? (y/n): ").strip().lower() == 'y'
-local_json_path = input("Do you have a PGP-exported JSON file for this season? (enter path or leave blank): ").strip()
-
-if (local_json_path.startswith('"') and local_json_path.endswith('"')) or \
-   (local_json_path.startswith("'") and local_json_path.endswith("'")):
-    local_json_path = local_json_path[1:-1]
+                print(f"Error processing {job.name}: {e}")
+                failed_seasons.append((job.abbr, f"{type(e).__name__}: {e}"))
+    finally:
+        # 出错或中断时也等已排队的评级完成并打印报告
+        ratings.close()
+        print(throttle.summary())
+        print_report(rows, ratings, time.monotonic() - started, failed_seasons)
+
+
+def warn_unknown_codes(jobs):
+    for job in jobs:
+        if not season_registry.is_season_code(job.abbr):
+            print(f"Warning: '{job.abbr}' is not a known season code (see season_registry.py).")
+
+
+def prompt_job():
+    """没有清单或命令行参数时，交互式输入一季的设置。"""
+    season_name = input("Enter the season name (e.g., Marching to the New Wonderland): ")
+    season_abbr = input("Enter the season abbreviation (e.g., MttNW): ")
+    if not season_registry.is_season_code(season_abbr):
+        print(f"Warning: '{season_abbr}' is not a known season code (see season_registry.py).")
+    conjectural = input("Do you want to add {{Conjectural}} template? (y/n): ").strip().lower() == 'y'
+    watch = input("Do you want to add the Watch section? (y/n): ").strip().lower() == 'y'
+    local_json_path = input("Do you have a PGP-exported JSON file for this season? (enter path or leave blank): ").strip()
+
+    if (local_json_path.startswith('"') and local_json_path.endswith('"')) or \
+       (local_json_path.startswith("'") and local_json_path.endswith("'")):
+        local_json_path = local_json_path[1:-1]
+
+    if local_json_path:
+        local_json_path = os.path.expanduser(local_json_path)
+        local_json_path = os.path.abspath(local_json_path)
+        print(f"Trying to load local JSON from: {local_json_path}")
+
+    return SeasonJob(season_name, season_abbr, conjectural, watch, local_json_path or None)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create episode pages for one or more seasons (interactive when no manifest/season is given)")
+    parser.add_argument('--manifest', help='YAML/JSON list of seasons: name, abbr, conjectural, watch, pgp')
+    parser.add_argument('--season', help='season name, for a single non-interactive season')
+    parser.add_argument('--abbr', help='season abbreviation (with --season)')
+    parser.add_argument('--conjectural', action='store_true', help='add {{Conjectural}} (with --season)')
+    parser.add_argument('--watch', action='store_true', help='add the Watch section (with --season)')
+    parser.add_argument('--pgp', help='PGP-exported JSON for the season (with --season)')
+    write_throttle.add_arguments(parser)
+    args = parser.parse_args()
+    write_throttle.configure(args)
+
+    if args.manifest:
+        jobs = load_manifest(args.manifest)
+        warn_unknown_codes(jobs)
+    elif args.season:
+        if not args.abbr:
+            parser.error('--season requires --abbr')
+        pgp_path = os.path.abspath(os.path.expanduser(args.pgp)) if args.pgp else None
+        jobs = [SeasonJob(args.season, args.abbr, args.conjectural, args.watch, pgp_path)]
+        warn_unknown_codes(jobs)
+    else:
+        jobs = [prompt_job()]
 
-if local_json_path:
-    local_json_path = os.path.expanduser(local_json_path)
-    local_json_path = os.path.abspath(local_json_path)
+    print(f"{len(jobs)} season(s): {', '.join(job.abbr for job in jobs)}")
+    run(jobs)
 
-if local_json_path:
-    print(f"Trying to load local JSON from: {local_json_path}")
-    if os.path.isfile(local_json_path):
-        try:
-            with open(local_json_path, "r", encoding='utf-8') as f:
-                local_json_data = json.load(f)
-            print(f"Loaded local JSON data from {local_json_path}")
-        except Exception as e:
-            print(f"Failed to parse local JSON file: {e}")
-            local_json_data = None
-    else:
-        print("File not found:", local_json_path)
-        local_json_data = None
-else:
-    local_json_data = None
 
-process_season(season_name, season_abbr, add_conjectural, add_watch)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Template:Episode/<Season>.json 的共享读取器（episode_create.py / still_gallery_move.py 共用）。
+
+- 直接取页面最新修订的原始内容（prop=revisions），不走 action=parse；
+- 解析后的 JSON 按 (season, revid) 缓存在本地目录；
+- 先用一个请求批量查出所有季当前的 revid，与缓存一致的直接读本地文件，
+  其余的再用一个多标题请求一次取回内容。
+"""
+import json
+import os
+import re
+
+import requests
+
+API_BASE = "https://xyy.miraheze.org/w/api.php"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+DEFAULT_CACHE_DIR = ".episode_json_cache"
+
+# 每个请求的标题数（API 上限 50）
+TITLES_PER_REQUEST = 50
+
+
+def season_json_title(season_name):
+    return f"Template:Episode/{season_name.replace('_', ' ').strip()}.json"
+
+
+class EpisodeJsonCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, session=None):
+        self.cache_dir = cache_dir
+        self.session = session or requests.Session()
+        self.session.headers.update(HEADERS)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.fetched = 0
+        self.from_cache = 0
+        # 最近一次 load() 时各季页面的 revid 与解析后的 JSON
+        self.revids = {}
+        self.loaded = {}
+
+    def _cache_path(self, season_name, revid):
+        safe = re.sub(r'[^0-9A-Za-z]+', '_', season_name).strip('_')
+        return os.path.join(self.cache_dir, f"{safe}.r{revid}.json")
+
+    def _query_revisions(self, titles, with_content):
+        """多标题查询最新修订，返回 {title: (revid, content 或 None)}；不存在的页面不在结果中。"""
+        out = {}
+        for i in range(0, len(titles), TITLES_PER_REQUEST):
+            chunk = titles[i:i + TITLES_PER_REQUEST]
+            params = {
+                "action": "query",
+                "prop": "revisions",
+                "titles": "|".join(chunk),
+                "rvprop": "ids|content" if with_content else "ids",
+                "format": "json",
+                "formatversion": "2",
+            }
+            if with_content:
+                params["rvslots"] = "main"
+            response = self.session.get(API_BASE, params=params, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+            if "error" in data:
+                raise RuntimeError(f"Unexpected API response: {data['error']}")
+            query = data.get("query", {})
+            original = {n["to"]: n["from"] for n in query.get("normalized", [])}
+            for page in query.get("pages", []):
+                if page.get("missing") or not page.get("revisions"):
+                    continue
+                rev = page["revisions"][0]
+                content = rev["slots"]["main"]["content"] if with_content else None
+                out[original.get(page["title"], page["title"])] = (rev["revid"], content)
+        return out
+
+    def load(self, season_names, skip_missing=False):
+        """
+        返回 {season_name: 解析后的 JSON}。所有季只需一个 revid 查询；
+        缓存过期或缺失的季再用一个多标题请求取内容。
+        页面不存在时抛出 KeyError；skip_missing=True 时改为不出现在结果中。
+        """
+        titles = {season: season_json_title(season) for season in season_names}
+        current = self._query_revisions(list(dict.fromkeys(titles.values())), with_content=False)
+        result = {}
+        stale = []
+        for season, title in titles.items():
+            if title not in current:
+                if skip_missing:
+                    continue
+                raise KeyError(f"{title} does not exist")
+            self.revids[season] = current[title][0]
+            path = self._cache_path(season, current[title][0])
+            if os.path.isfile(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    result[season] = json.load(f)
+                self.from_cache += 1
+                self.loaded[season] = result[season]
+            else:
+                stale.append(season)
+
+        if stale:
+            fetched = self._query_revisions(list(dict.fromkeys(titles[s] for s in stale)), with_content=True)
+            for season in stale:
+                revid, content = fetched[titles[season]]
+                result[season] = json.loads(content)
+                self.loaded[season] = result[season]
+                self._store(season, revid, content)
+                self.fetched += 1
+        return result
+
+    def _store(self, season_name, revid, content):
+        path = self._cache_path(season_name, revid)
+        prefix = os.path.basename(path).rsplit(".r", 1)[0] + ".r"
+        # 同一季的旧修订缓存不再需要
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith(".json"):
+                os.remove(os.path.join(self.cache_dir, name))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def get(self, season_name):
+        """单季的 JSON；本实例已 load() 过的季直接返回，不再查询 revid。"""
+        if season_name in self.loaded:
+            return self.loaded[season_name]
+        return self.load([season_name])[season_name]
+
@@ -1,15 +1,39 @@
+import argparse
 import pywikibot
 import re
 import difflib
 import html
+from collections import namedtuple
 
-site = pywikibot.Site('en', 'xyy')
-site.login()
+import edit_plan
+import season_registry
+from compliance_ledger import SETTLED_VERDICTS, VERDICT_MANUAL, ComplianceLedger
+from pipeline_stages import background, ordered_map
+from review_queue import ReviewQueue
+from sweep_checkpoint import DEFAULT_FLUSH_EVERY, SweepCheckpoint
+from wikitext_sections import SectionIndex
+import write_throttle
+from write_throttle import AdaptiveThrottle
+
+# 在 main() 中登录；模块本身可离线导入（dump_audit.py / 基准测试只用纯文本函数）
+site = None
+
+# 所有保存共用一个自适应节流器，在 main() 中登录后创建
+throttle = None
 
 FILE_NS = 6  # File namespace
 
-# 匹配 Summary / Licensing 标题（并保留原始标题字符串）
-HEADER_REGEX = re.compile(r'^(?P<header>={2,}\s*(?P<title>.+?)\s*={2,})\s*$', re.MULTILINE|re.IGNORECASE)
+# 每个 API 请求批量取回的页面数（generator=allpages + prop=revisions 一次带回正文）
+# 非 bot 账号取正文的上限为 50
+DEFAULT_BATCH_SIZE = 50
+
+# 断点续跑状态文件（--resume 时从这里继续）
+DEFAULT_STATE_PATH = 'file_cleanup.state.json'
+
+# 合规台账（记录每页最后检查的 revid 与结论）
+DEFAULT_LEDGER_PATH = 'file_cleanup_ledger.sqlite'
+# 台账模式下最多缓冲多少个列表页面后再预载正文（保证输出顺序与列表一致）
+LEDGER_BUFFER_SIZE = 500
 
 # 允许的 licensing template 名称（小写比较）
 ALLOWED_LICENSE_TEMPLATES = {
@@ -43,24 +67,15 @@ def section_is_single_template_whole(section_text, allowed_templates):
         return False, None
     return (name.lower() in allowed_templates), name.lower()
 
-def extract_section_block_from_text(raw_text, section_title):
+def extract_section_block_from_text(raw_text, section_title, index=None):
     """
     从 raw_text 中直接抽取指定标题（case-insensitive）的 section 内容（header 之后到下一 header 之前，不做 strip）。
     返回该段原始字符串（包含任何换行/空白），若找不到返回 None。
+    已有 raw_text 的 SectionIndex 时传入 index，避免重复扫描。
     """
-    # 使用 HEADER_REGEX 原始匹配器查找 header 位置（和 split_headers 使用的正则相同）
-    it = list(HEADER_REGEX.finditer(raw_text))
-    for i, m in enumerate(it):
-        title = m.group('title').strip().lower()
-        if title == section_title.lower():
-            start = m.end()
-            # 下一 header 的 start 如果存在
-            if i + 1 < len(it):
-                end = it[i+1].start()
-            else:
-                end = len(raw_text)
-            return raw_text[start:end]
-    return None
+    if index is None:
+        index = SectionIndex(raw_text)
+    return index.block(section_title)
 
 def equal_ignoring_trailing_single_newline(a, b):
     """
@@ -80,43 +95,17 @@ def equal_ignoring_trailing_single_newline(a, b):
     return False
 
 
-def split_headers(text):
+def split_headers(text, index=None):
     """
     返回 (leading_text, list_of_sections)
     每个 section 为 (header_full_text, title_normalized, start_index, end_index, content_text)
+    已有 text 的 SectionIndex 时传入 index，避免重复扫描。
     """
-    sections = []
-    last_pos = 0  # 上一个 header 的 end()，用于切取 content
-    for m in HEADER_REGEX.finditer(text):
-        start = m.start()
-        title = m.group('title').strip()
-        header_full = m.group('header')  # 保留原始 header 格式
-
-        if not sections:
-            # 首个 header 之前的内容暂时不设置为 leading，这里只记录
-            # leading 最终由下方的 first_header_match 确定，以保证一致性
-            pass
-        else:
-            # 上一个 section 的 content 应该从 last_pos（上一个 header 的 end()）到当前 header 的 start()
-            prev = sections[-1]
-            # 使用 last_pos（而不是 prev[3]，prev[3] 可能为 None）
-            sections[-1] = (prev[0], prev[1], prev[2], start, text[last_pos:start])
-
-        sections.append((header_full, title, start, None, None))
-        last_pos = m.end()
-
-    if not sections:
-        leading = text
-        return leading, []
-    else:
-        # 最后一节 content 从 last_pos 到文本末尾
-        header_full, title, start, _, _ = sections[-1]
-        sections[-1] = (header_full, title, start, len(text), text[last_pos:])
-
-        # leading as before: text before first header
-        first_header_match = HEADER_REGEX.search(text)
-        leading = text[:first_header_match.start()] if first_header_match else ''
-        return leading, sections
+    if index is None:
+        index = SectionIndex(text)
+    sections = [(sec.header, sec.title, sec.start, sec.end, index.text[sec.content_start:sec.end])
+                for sec in index.sections]
+    return index.leading, sections
 
 
 def first_nonempty_line(s):
@@ -187,156 +176,422 @@ def normalize_spaces_between_sections(original_between_text):
     return original_between_text
 
 def parse_title(title):
-    # 允许的 season 列表
-    allowed_seasons = [
-        's1', 'pgabbw', 'xyyyhtl', 'pgsg', 'yyydh', 'jos', 'yykldyn', 'sd', 'qsmxxyy', 'happy happy bang bang', 'hhbb', 'gkljy', 'tac', 'jjdlm', 'thd', 'kxrj', 'hf', 'kxfcs', 'ptac', 'lyyddc', 'dlw', 'yyxxy', "the tailor's closet", 'ttc', 'ycdmx', 'lyb', 'mmlfk', 'aitpw', 'yssjlxj', 'mttnw', 'xh1', 'xhcsj', 'tld', 'yyxzt', 'aits', 'shlxj', 'mttnw2', 'xh2', 'woi', 'fmdzz', 'flying island', 'fitsa', 'qhtkd', 'mttnw3', 'xh3', 'mld', 'ycshz', 'ys1', 'woi2', 'rat', 'kskjb', 'mttnw4', 'xh4', 'tiag', 'qqwxk', 'mld2', 'ys2', 'mld3', 'ys3', 'atdf', 'ygdyj', 'dfv', 'kcsl', 'ultimate battle', 'mld4', 'ys4', 'ubtng', 'jzcsd', 'mld5', 'ys5', 'tgr', 'qhdyj', 'mld6', 'ys6', 'tst', 'ycsjc', 'mld7', 'ys7', 'moa', 'aysmy', "explore wolffy's mind", 'mld8', 'ys8', 'ewm', 'xsjqy', 'mld9', 'ys9', 'ch', 'fkcny', 'mld10', 'ys10', 'mwr', 'qxdyj', 'mld11', 'ys11', 'nwc', 'kyxyz', 'atwi20d', 'atwi2d', 'atwitd', 'xyyysb', 'epg', 'yydyxyy', 'mjt', 'mwmr', 'jrjjhtl', 'pgfc', 'pgfc1', 'zqyxt1', 'anp', 'ap', 'pgfc2', 'zqyxt2', 'saf', 'pgfc3', 'pgfctec', 'zqyxt3', 'tec', 'pgfc4', 'zqyxt4', 'tatw', 'pgfc5', 'zqyxt5', 'iw', 'pgfc6', 'zqyxt6', 'ft', 'mgs', 'yyqmx', 'mgs2', 'mgsii', 'yyqmx2', 'movie1', 'm1', 'tsa', 'nqct', 'movie2', 'm2', 'dttaotlt', 'hhsw', 'movie3', 'm3', 'mctsa', 'tndgg', 'movie4', 'm4', 'miaotdt', 'kxcln', 'movie5', 'm5', 'tma', 'xqyygsn', 'movie6', 'm6', 'mtp', 'fmqyj', 'movie7', 'm7', 'apg', 'ynxyy', 'movie8', 'm8', 'dff', 'kcwl', 'movie9', 'm9', 'twg', 'sh', 'movie10', 'm10', 'bnd', 'ygpx', 'live-action1', 'la1', 'ilw', 'wahtl', 'live-action2', 'la2', 'ilw2', 'wahtl2'
-    ]
-    # 用 join 拼成正则 alternation
-    season_pattern = '|'.join(re.escape(s) for s in allowed_seasons)
-
-    # 匹配模式：File:season + number + .png
-    pattern = rf'^File:({season_pattern})(\d+)\.png$'
-
-    match = re.match(pattern, title.lower(), flags=re.IGNORECASE)
+    # season 代号匹配使用 season_registry 预建的前缀树（多个代号都能匹配时按集数是否合法取舍）
+    match = season_registry.match_file_title(title)
     if match:
-        season = match.group(1)
-        number = match.group(2)  # 保留原样（可能有前导零）
+        season, number = match  # number 保留原样（可能有前导零）
         number = number.lstrip('0')
         ep = r'{{ep|' + season + '|' + number + '}}'
         return ep
     return None
 
-def process_all_file_pages():
-    for page in site.allpages(namespace=FILE_NS):
-        title = page.title()
-        try:
-            if not page.exists():
-                print(f"[SKIP] {title} does not exist.")
-                continue
-            text = page.text or ''
-            if title.startswith('File:Act 0109'):
-                print(f"[SKIP] {title} has been cleaned already.")
-                continue
-            if text.strip() == '':
-                print(f"[BLANK] {get_url(title)} — empty file description. No automatic fix; please check manually.")
-                input('Press Enter to continue...')
-                continue
+def iter_file_pages(batch_size=DEFAULT_BATCH_SIZE, start=None, ledger=None):
+    """
+    遍历 File 名字空间，产出 (page, settled)。start 为完整标题时从该页（含）开始列出，用于断点续跑。
 
-            leading, sections = split_headers(text)
-            # normalize header titles lowercased
-            header_titles = [s[1].strip().lower() for s in sections]
+    不使用台账时，正文随列表一起批量取回（每个请求 batch_size 个页面），避免逐页 exists()/text 请求；
+    allpages 只返回存在的页面，因此无需再检查存在性。
 
-            # if any extra sections other than summary/licensing -> manual
-            extras = [h for h in header_titles if h not in ('summary','licensing')]
-            if extras:
-                print(f"[MANUAL] {get_url(title)} — contains extra sections {extras}. No automatic fix; please check manually.")
-                input('Press Enter to continue...')
-                continue
+    使用台账时，列表只带 revid 等元数据；最新 revid 与台账一致且已合规的页面 settled=True，不取正文，
+    其余页面按 batch_size 一批补取正文。
+    """
+    if start:
+        start = pywikibot.Page(site, start).title(with_ns=False)
+    gen = site.allpages(start=start or '!', namespace=FILE_NS, content=ledger is None)
+    if ledger is None:
+        gen.set_query_increment(batch_size)
+        for page in gen:
+            yield page, False
+        return
+
+    pending = []  # 保持列表顺序：攒够 batch_size 个需要取正文的页面再一起预载
+    n_stale = 0
+    for page in gen:
+        settled = ledger.is_settled(page.title(), page.latest_revision_id)
+        pending.append((page, settled))
+        if not settled:
+            n_stale += 1
+        if n_stale >= batch_size or len(pending) >= LEDGER_BUFFER_SIZE:
+            yield from _preload_stale(pending, batch_size)
+            pending = []
+            n_stale = 0
+    yield from _preload_stale(pending, batch_size)
+
+def _preload_stale(pending, batch_size):
+    stale = [page for page, settled in pending if not settled]
+    if stale:
+        list(site.preloadpages(stale, groupsize=batch_size))
+    yield from pending
+
+# classify_page 返回的处理动作
+ACTION_OK = 'ok'            # 已合规，无需改动
+ACTION_FIX = 'fix'          # 自动修复，无需确认
+ACTION_CONFIRM = 'confirm'  # 有修复方案，但需要人工确认 diff
+ACTION_MANUAL = 'manual'    # 无自动方案，需人工处理
+
+# 页面结构分类（离线审计按此汇总）
+CASE_BLANK = 'blank'            # 空描述
+CASE_EXTRA = 'extra-sections'   # 含 Summary / Licensing 以外的段落
+CASE_A = 'no-headers'           # CASE A：没有任何 header
+CASE_B = 'licensing-only'       # CASE B：只有 Licensing
+CASE_C = 'leading-text'         # CASE C：首个 header 前有文本且没有 Summary
+CASE_D = 'compliant'            # CASE D：Summary + Licensing 且完全合规
+CASE_UNUSUAL = 'unusual'        # 其它（含模板不合规、空行过多等）
+
+# case: 上述分类之一；action: 上述动作之一；tag: 日志前缀（OK / BLANK / MANUAL / FIXED）；note: 日志说明；
+# new_text/summary: 修复后的文本与编辑摘要（仅 fix/confirm）；sections: 检测到的 header 标题（小写）
+Verdict = namedtuple('Verdict', ['case', 'action', 'tag', 'note', 'new_text', 'summary', 'sections'])
+
+def classify_page(title, text):
+    """
+    对单个 File 页面的文本执行 CASE A–D 判断（纯文本处理，不做任何网络请求）。
+    返回 Verdict。
+    """
+    if text.strip() == '':
+        return Verdict(CASE_BLANK, ACTION_MANUAL, 'BLANK', "empty file description. No automatic fix; please check manually.",
+                       None, None, [])
+
+    # 整页只扫描一次 header，后续判断都复用这个索引
+    index = SectionIndex(text)
+    leading, sections = split_headers(text, index)
+    # normalize header titles lowercased
+    header_titles = [s[1].strip().lower() for s in sections]
+
+    # if any extra sections other than summary/licensing -> manual
+    extras = [h for h in header_titles if h not in ('summary','licensing')]
+    if extras:
+        return Verdict(CASE_EXTRA, ACTION_MANUAL, 'MANUAL', f"contains extra sections {extras}. No automatic fix; please check manually.",
+                       None, None, header_titles)
+
+    # CASE A: no headers at all
+    if not sections:
+        # create default Summary and Licensing, preserve original content as d=
+        orig = text.rstrip('\n')
+        new_text = "== Summary ==\n" + "{{fi|d=" + orig + "|s=}}\n\n" + "== Licensing ==\n{{Fairuse}}\n"
+        if not equal_ignoring_trailing_single_newline(new_text, text):
+            return Verdict(CASE_A, ACTION_CONFIRM, 'FIXED', "inserted default Summary and Licensing.",
+                           new_text, "autofix file description: default sections", header_titles)
+        return Verdict(CASE_A, ACTION_OK, 'OK', "already same.", None, None, header_titles)
+
+    # build map from lower title => section tuple
+    sec_map = {s[1].strip().lower(): s for s in sections}
+
+    # CASE B: only Licensing exists
+    if 'licensing' in sec_map and 'summary' not in sec_map:
+        lic_header_full, lic_title, lic_start, lic_end, lic_content = sec_map['licensing']
+        # preserve licensing header format (lic_header_full)
+        # keep original between text before licensing header (leading-> we treat separately)
+        ep = parse_title(title)
+        if ep:
+            new_summary_header = "== Summary ==\n{{fi|d=Title card of " + ep + ".|s=" + ep + "}}\n"
+        else:
+            new_summary_header = "== Summary ==\n{{fi|s=}}\n"
+        # Determine the whitespace between our new summary block and existing licensing header:
+        # if there was leading content (text before first header) keep it (should be empty here),
+        # but ensure at most one blank line between summary and licensing: we'll use a single newline
+        new_text = new_summary_header + lic_header_full + "\n" + lic_content.lstrip('\n')
+        if not equal_ignoring_trailing_single_newline(new_text, text):
+            return Verdict(CASE_B, ACTION_FIX, 'FIXED', "added default Summary above Licensing.",
+                           new_text, "autofix file description: default summary section", header_titles)
+        return Verdict(CASE_B, ACTION_OK, 'OK', "no change needed.", None, None, header_titles)
+
+    # CASE C: leading text exists (text before first header) and no explicit Summary header
+    if leading and leading.strip() and 'summary' not in sec_map:
+        # Move leading into Summary using Fi|d=
+        orig_leading = leading.rstrip('\n')
+        new_summary_block = "== Summary ==\n" + "{{fi|d=" + orig_leading + "|s=}}\n"
+        # append all existing headers (we only expect Licensing now)
+        remaining_blocks = []
+        for header_full, title_name, start, end, content in sections:
+            # keep original header_full (preserve spacing) and content (but strip leading blank lines)
+            remaining_blocks.append(header_full + "\n" + content.lstrip('\n'))
+        # ensure one blank line between summary block and next header if the original had one blank line
+        between = '\n'
+        new_text = new_summary_block + between + ("\n\n".join(remaining_blocks)).lstrip('\n')
+        if not equal_ignoring_trailing_single_newline(new_text, text):
+            return Verdict(CASE_C, ACTION_CONFIRM, 'FIXED', "moved leading content into Summary.",
+                           new_text, "autofix file description: add summary section", header_titles)
+        return Verdict(CASE_C, ACTION_OK, 'OK', "no change needed.", None, None, header_titles)
+
+    # CASE D: have both Summary and Licensing
+    # ---- 快速基于原始文本的合规性检查（优先使用，不走后续分段重建） ----
+    # 如果页面同时存在 Summary 与 Licensing 两个 header，直接从原始 text 提取对应 block 来判断，
+    # 如果已完全合规就直接跳过（避免任何重写/重建导致空行变化）。
+    if 'summary' in sec_map and 'licensing' in sec_map:
+        raw_sum_block = extract_section_block_from_text(text, 'summary', index)
+        raw_lic_block = extract_section_block_from_text(text, 'licensing', index)
+
+        if raw_sum_block is not None and raw_lic_block is not None:
+            sum_ok, _ = section_is_single_template_whole(raw_sum_block, ALLOWED_SUMMARY_TEMPLATES)
+            lic_ok, _ = section_is_single_template_whole(raw_lic_block, ALLOWED_LICENSE_TEMPLATES)
+
+            # 允许 header 下方有 0 或 1 个空行（即不以两个或更多连续换行开头）
+            def header_blank_ok(block):
+                # block 以 '\n\n' 或更多换行开头表示 header 后至少有 2 个空行 -> 不允许
+                return not block.startswith('\n\n')
+
+            # Licensing 末尾多余空行的判断（与之前逻辑保持一致）
+            lic_ends_with_extra_blank = bool(re.search(r'\n\s*\Z', raw_lic_block)) and raw_lic_block.rstrip('\n') != raw_lic_block
+
+            if sum_ok and lic_ok and header_blank_ok(raw_sum_block) and header_blank_ok(raw_lic_block) and not lic_ends_with_extra_blank:
+                return Verdict(CASE_D, ACTION_OK, 'OK', "fully compliant; skipped.", None, None, header_titles)
+    # ---- 如果不满足快速跳过条件，继续原有分段/清理逻辑 ----
+
+    # fallback
+    return Verdict(CASE_UNUSUAL, ACTION_MANUAL, 'MANUAL', "unusual structure, skipped. Please inspect manually.",
+                   None, None, header_titles)
+
+def hold(page, text, reason, note, sections, queue):
+    """
+    需要人工处理的页面：未开启队列时照旧暂停等待回车；
+    开启队列时写入复查队列后立即继续。
+    """
+    if queue is None:
+        input("Press Enter to continue...")
+        return
+    title = page.title()
+    try:
+        revid = page.latest_revision_id
+    except Exception:
+        revid = None
+    queue.append({
+        'title': title,
+        'url': get_url(title),
+        'reason': reason,
+        'note': note,
+        'sections': sections,
+        'revid': revid,
+        'text': text,
+    })
+    print(f"[QUEUED] {title} — {reason}")
+
+def apply_verdict(page, text, verdict, queue=None, plan=None):
+    """
+    按 classify_page 的结果执行（打印日志 / 保存 / 确认 / 入队）。
+    plan 不为 None 时，有修复方案的页面只写入编辑计划，不确认也不保存。
+    返回结果标记：OK / FIXED / SKIPPED / MANUAL / PLANNED。
+    """
+    title = page.title()
+    if verdict.action == ACTION_OK:
+        print(f"[OK] {title} — {verdict.note}")
+        return 'OK'
+    if verdict.action == ACTION_MANUAL:
+        print(f"[{verdict.tag}] {get_url(title)} — {verdict.note}")
+        hold(page, text, verdict.tag.lower(), verdict.note, verdict.sections, queue)
+        return 'MANUAL'
+    if plan is not None:
+        plan.add(page, text, verdict.new_text, verdict.summary)
+        return 'PLANNED'
+    if verdict.action == ACTION_CONFIRM:
+        if queue is not None:
+            # 队列模式下不阻塞，diff 留到复查会话中确认
+            hold(page, text, 'confirm', verdict.note, verdict.sections, queue)
+            return 'MANUAL'
+        if not prompt_apply(title, text, verdict.new_text):
+            print(f"[SKIPPED] {title}")
+            return 'SKIPPED'
+    page.text = verdict.new_text
+    throttle.call(page.save, summary=verdict.summary)
+    print(f"[FIXED] {title} — {verdict.note}")
+    return 'FIXED'
+
+def classify_fetched(item):
+    """
+    分类阶段（不写 wiki）：读取已预载的正文并执行 classify_page。
+    返回 (page, settled, text, verdict, error)。
+    """
+    page, settled = item
+    if settled:
+        return page, settled, None, None, None
+    text = ''
+    try:
+        text = page.text or ''
+        return page, settled, text, classify_page(page.title(), text), None
+    except Exception as e:
+        return page, settled, text, None, e
+
+def write_result(page, settled, text, verdict, error, queue=None, ledger=None, plan=None):
+    """
+    写入阶段（串行）：执行保存 / 确认 / 入队，并记入台账。返回结果标记。
+    """
+    title = page.title()
+    if settled:
+        # revid 与台账一致，上次已确认合规：不取正文
+        return 'UNCHANGED'
+    if error is None:
+        try:
+            outcome = apply_verdict(page, text, verdict, queue, plan)
+        except Exception as e:
+            error = e
+    if error is not None:
+        print(f"[ERROR] {get_url(title)} — {error}")
+        hold(page, text, 'error', str(error), [], queue)
+        outcome = 'ERROR'
+
+    # 出错的页面不记入台账，下轮重新检查
+    if ledger and outcome != 'ERROR':
+        verdict = outcome if outcome in SETTLED_VERDICTS else VERDICT_MANUAL
+        ledger.record(title, page.latest_revision_id, verdict)
+    return outcome
+
+def process_all_file_pages(batch_size=DEFAULT_BATCH_SIZE, queue=None, checkpoint=None, ledger=None,
+                           pipeline=False, prefetch=None, plan=None):
+    """
+    串行模式：取一页、判断、保存，再取下一页。
+    pipeline=True 时分三个阶段重叠执行：后台线程预取后续批次的正文（最多缓冲 prefetch 页），
+    分类线程执行 CASE A–D 判断，当前线程作为唯一的写入者按原顺序保存并打印日志
+    （page.save 仍受 pywikibot 的编辑节流控制）。
+    """
+    start = checkpoint.start_for(FILE_NS) if checkpoint else None
+    pages = iter_file_pages(batch_size, start=start, ledger=ledger)
+    if pipeline:
+        depth = prefetch or 2 * batch_size
+        pages = background(pages, depth)
+        results = ordered_map(classify_fetched, pages, workers=1, depth=depth)
+    else:
+        results = map(classify_fetched, pages)
 
-            # CASE A: no headers at all
-            if not sections:
-                # create default Summary and Licensing, preserve original content as d=
-                orig = text.rstrip('\n')
-                new_text = "== Summary ==\n" + "{{fi|d=" + orig + "|s=}}\n\n" + "== Licensing ==\n{{Fairuse}}\n"
-                if not equal_ignoring_trailing_single_newline(new_text, text):
-                    if prompt_apply(title, text, new_text):
-                        page.text = new_text
-                        page.save(summary="autofix file description: default sections")
-                        print(f"[FIXED] {title} — inserted default Summary and Licensing.")
-                    else:
-                        print(f"[SKIPPED] {title}")
-                else:
-                    print(f"[OK] {title} — already same.")
+    n_settled = 0
+    try:
+        for page, settled, text, verdict, error in results:
+            title = page.title()
+            if checkpoint and checkpoint.is_done(FILE_NS, title):
                 continue
-
-            # build map from lower title => section tuple
-            sec_map = {s[1].strip().lower(): s for s in sections}
-
-            # CASE B: only Licensing exists
-            if 'licensing' in sec_map and 'summary' not in sec_map:
-                lic_header_full, lic_title, lic_start, lic_end, lic_content = sec_map['licensing']
-                # preserve licensing header format (lic_header_full)
-                # keep original between text before licensing header (leading-> we treat separately)
-                if parse_title(title):
-                    ep = parse_title(title)
-                    new_summary_header = "== Summary ==\n{{fi|d=Title card of " + ep + ".|s=" + ep + "}}\n"
-                else:
-                    new_summary_header = "== Summary ==\n{{fi|s=}}\n"
-                # Determine the whitespace between our new summary block and existing licensing header:
-                # if there was leading content (text before first header) keep it (should be empty here),
-                # but ensure at most one blank line between summary and licensing: we'll use a single newline
-                new_text = new_summary_header + lic_header_full + "\n" + lic_content.lstrip('\n')
-                if not equal_ignoring_trailing_single_newline(new_text, text):
-                    page.text = new_text
-                    page.save(summary="autofix file description: default summary section")
-                    print(f"[FIXED] {title} — added default Summary above Licensing.")
-                    # if prompt_apply(title, text, new_text):
-                    #     page.text = new_text
-                    #     page.save(summary="autofix file description: default summary section")
-                    #     print(f"[FIXED] {title} — added default Summary above Licensing.")
-                    # else:
-                    #     print(f"[SKIPPED] {title}")
-                else:
-                    print(f"[OK] {title} — no change needed.")
+            n_settled += settled
+            outcome = write_result(page, settled, text, verdict, error, queue, ledger, plan)
+            if checkpoint:
+                checkpoint.record(FILE_NS, title, outcome)
+    except BaseException:
+        # 网络错误 / Ctrl-C 等中断：先把进度落盘，下次 --resume 从这里继续
+        if ledger:
+            ledger.commit()
+        if checkpoint:
+            checkpoint.flush()
+            print(f"Interrupted; progress saved to {checkpoint.path} — {checkpoint.summary()}")
+        raise
+    finally:
+        if pipeline:
+            results.close()
+            pages.close()
+    if ledger:
+        ledger.commit()
+        print(f"{n_settled} page(s) unchanged since last verification; not re-fetched.")
+    if checkpoint:
+        checkpoint.finish()
+        print(f"Sweep finished — {checkpoint.summary()}")
+
+def review_queued_pages(queue, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    交互式处理复查队列。
+    先批量查询所有队列页面的最新 revid（不取正文）；revid 未变的页面直接使用入队时保存的文本，
+    只有 revid 变化的页面才重新取正文并重新判断（已变为合规的直接出队）。
+    未处理完（保留 / 中途退出）的记录写回队列文件。
+    """
+    records = queue.load()
+    if not records:
+        print("Review queue is empty.")
+        return
+
+    pages = {rec['title']: pywikibot.Page(site, rec['title']) for rec in records}
+    list(site.preloadpages(list(pages.values()), groupsize=batch_size, content=False))
+    # 入队时没拿到 revid 的（如 [ERROR]）一律视为已变化
+    changed = {rec['title'] for rec in records
+               if pages[rec['title']].exists() and (rec.get('revid') is None
+                                                    or pages[rec['title']].latest_revision_id != rec['revid'])}
+    if changed:
+        print(f"{len(changed)} of {len(records)} queued pages changed since queued; re-fetching them.")
+        list(site.preloadpages([pages[t] for t in changed], groupsize=batch_size))
+
+    remaining = []
+    for n, rec in enumerate(records):
+        title = rec['title']
+        page = pages[title]
+        try:
+            if not page.exists():
+                print(f"[GONE] {title} — page no longer exists; dropped.")
                 continue
-
-            # CASE C: leading text exists (text before first header) and no explicit Summary header
-            first_header = sections[0]
-            if leading and leading.strip() and 'summary' not in sec_map:
-                # Move leading into Summary using Fi|d=
-                orig_leading = leading.rstrip('\n')
-                new_summary_block = "== Summary ==\n" + "{{fi|d=" + orig_leading + "|s=}}\n"
-                # append all existing headers (we only expect Licensing now)
-                remaining_blocks = []
-                for header_full, title_name, start, end, content in sections:
-                    # keep original header_full (preserve spacing) and content (but strip leading blank lines)
-                    remaining_blocks.append(header_full + "\n" + content.lstrip('\n'))
-                # ensure one blank line between summary block and next header if the original had one blank line
-                between = '\n'
-                new_text = new_summary_block + between + ("\n\n".join(remaining_blocks)).lstrip('\n')
-                if not equal_ignoring_trailing_single_newline(new_text, text):
-                    if prompt_apply(title, text, new_text):
-                        page.text = new_text
-                        page.save(summary="autofix file description: add summary section")
-                        print(f"[FIXED] {title} — moved leading content into Summary.")
-                    else:
-                        print(f"[SKIPPED] {title}")
-                else:
-                    print(f"[OK] {title} — no change needed.")
+            if title in changed:
+                text = page.text or ''
+                verdict = classify_page(title, text)
+                if verdict.action in (ACTION_OK, ACTION_FIX):
+                    apply_verdict(page, text, verdict)
+                    continue
+            else:
+                text = rec.get('text') or ''
+                verdict = classify_page(title, text)
+
+            print(f"\n[{n + 1}/{len(records)}] {rec['url']} — {rec['reason']}: {verdict.note}")
+            if verdict.sections:
+                print(f"  sections: {verdict.sections}")
+            if verdict.action == ACTION_CONFIRM:
+                apply_verdict(page, text, verdict)
                 continue
 
-            # CASE D: have both Summary and Licensing
-            # ---- 快速基于原始文本的合规性检查（优先使用，不走后续分段重建） ----
-            # 如果页面同时存在 Summary 与 Licensing 两个 header，直接从原始 text 提取对应 block 来判断，
-            # 如果已完全合规就直接跳过（避免任何重写/重建导致空行变化）。
-            if 'summary' in sec_map and 'licensing' in sec_map:
-                raw_sum_block = extract_section_block_from_text(text, 'summary')
-                raw_lic_block = extract_section_block_from_text(text, 'licensing')
-
-                if raw_sum_block is not None and raw_lic_block is not None:
-                    sum_ok, _ = section_is_single_template_whole(raw_sum_block, ALLOWED_SUMMARY_TEMPLATES)
-                    lic_ok, _ = section_is_single_template_whole(raw_lic_block, ALLOWED_LICENSE_TEMPLATES)
-
-                    # 允许 header 下方有 0 或 1 个空行（即不以两个或更多连续换行开头）
-                    def header_blank_ok(block):
-                        # block 以 '\n\n' 或更多换行开头表示 header 后至少有 2 个空行 -> 不允许
-                        return not block.startswith('\n\n')
-
-                    # Licensing 末尾多余空行的判断（与之前逻辑保持一致）
-                    lic_ends_with_extra_blank = bool(re.search(r'\n\s*\Z', raw_lic_block)) and raw_lic_block.rstrip('\n') != raw_lic_block
-
-                    if sum_ok and lic_ok and header_blank_ok(raw_sum_block) and header_blank_ok(raw_lic_block) and not lic_ends_with_extra_blank:
-                        print(f"[OK] {title} — fully compliant; skipped.")
-                        continue
-            # ---- 如果不满足快速跳过条件，继续原有分段/清理逻辑 ----
-
-            # fallback
-            print(f"[MANUAL] {get_url(title)} — unusual structure, skipped. Please inspect manually.")
-            input("Press Enter to continue...")
-
+            choice = input("Enter = done, k = keep in queue, q = quit: ").strip().lower()
+            if choice == 'q':
+                remaining.extend(records[n:])
+                break
+            if choice == 'k':
+                remaining.append(rec)
         except Exception as e:
-            print(f"[ERROR] {get_url(title)} — {e}")
-            input("Press Enter to continue...")
+            print(f"[ERROR] {rec['url']} — {e}")
+            remaining.append(rec)
+
+    queue.rewrite(remaining)
+    print(f"Review finished; {len(remaining)} page(s) left in {queue.path}.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean up File page descriptions (Summary / Licensing)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Pages (with content) fetched per API request (default: %(default)s)")
+    parser.add_argument("--queue", metavar="PATH",
+                        help="Unattended mode: append pages needing a human to this JSONL file instead of pausing")
+    parser.add_argument("--review", metavar="PATH",
+                        help="Walk a review queue written by --queue in one interactive session")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, metavar="PATH",
+                        help="Checkpoint file for the sweep (default: %(default)s)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue after the last page recorded in --state instead of starting over")
+    parser.add_argument("--flush-every", type=int, default=DEFAULT_FLUSH_EVERY,
+                        help="Write the checkpoint every N pages (default: %(default)s)")
+    parser.add_argument("--ledger", default=DEFAULT_LEDGER_PATH, metavar="PATH",
+                        help="SQLite ledger of verified revids; unchanged pages are not re-fetched (default: %(default)s)")
+    parser.add_argument("--no-ledger", action="store_true",
+                        help="Fetch and check every page regardless of the ledger (the ledger is not updated)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Overlap prefetching / classification with saving (single serialized writer)")
+    parser.add_argument("--prefetch", type=int, default=None, metavar="N",
+                        help="Pipeline mode: pages buffered ahead of the writer (default: 2 x batch size)")
+    edit_plan.add_arguments(parser)
+    write_throttle.add_arguments(parser)
+    args = parser.parse_args()
+    write_throttle.configure(args)
+
+    def get_site():
+        global site, throttle
+        site = pywikibot.Site('en', 'xyy')
+        site.login()
+        throttle = AdaptiveThrottle.for_site(site)
+        return site
+
+    if edit_plan.run_plan_command(args, get_site, batch_size=args.batch_size):
+        return
+    get_site()
+
+    if args.review:
+        review_queued_pages(ReviewQueue(args.review), batch_size=args.batch_size)
+        return
+    queue = ReviewQueue(args.queue) if args.queue else None
+    plan = edit_plan.PlanWriter(args.plan) if args.plan else None
+    checkpoint = SweepCheckpoint(args.state, resume=args.resume, flush_every=args.flush_every)
+    ledger = None if args.no_ledger else ComplianceLedger(args.ledger)
+    try:
+        process_all_file_pages(batch_size=args.batch_size, queue=queue, checkpoint=checkpoint, ledger=ledger,
+                               pipeline=args.pipeline, prefetch=args.prefetch, plan=plan)
+    finally:
+        if ledger:
+            ledger.close()
+        print(throttle.summary())
 
 if __name__ == "__main__":
-    process_all_file_pages()
+    main()
@@ -0,0 +1,119 @@
+"""
+用 gradio_client 的 job API（client.submit）并发提交识别任务。
+
+run_jobs() 保持最多 max_in_flight 个任务在途，任务完成一个就补交一个，按完成顺序产出结果；
+每个任务有独立超时，超时、出错或提交失败的任务会在退避 retry_delay·2^(n-1) 秒后重新提交（最多 retries 次），
+Space 正在重启时不会在几毫秒内把重试次数用光。等待重试的任务同样占用在途名额。
+"""
+import time
+
+DEFAULT_TIMEOUT = 120
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_DELAY = 2.0
+
+
+def run_jobs(submit, items, max_in_flight=4, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+             release=None, poll=0.05, retry_delay=DEFAULT_RETRY_DELAY):
+    """
+    submit(item) 提交一个任务并返回 gradio_client 的 Job；返回 None 表示该项不需要识别，原样放行。
+    按完成顺序产出 (item, result, error)：成功时 error 为 None；重试用尽后 result 为 None、error 为最后一次的异常。
+    release(item)（可选）在该项最终完成（成功、失败或放行）后调用一次，用于清理临时文件等。
+    结束或被关闭时关闭 items（若它是生成器）。
+
+    注意 gradio_client 的 Job 只是包装了内部 Future，这里只用 done() / result() / cancel() 轮询，
+    不依赖 concurrent.futures.wait()。
+    """
+    items = iter(items)
+    in_flight = []  # [job, item, attempt, started]
+    waiting = []  # [not_before, item, attempt]：等待退避结束后重新提交
+    exhausted = False
+
+    def finish(item):
+        if release is not None:
+            release(item)
+
+    def retry_later(item, attempt, error):
+        """attempt 次失败后安排退避重试；重试用尽时返回需要产出的 (item, None, error)，否则返回 None。"""
+        if attempt > retries:
+            finish(item)
+            return item, None, error
+        delay = retry_delay * 2 ** (attempt - 1)
+        print(f"  [retry {attempt}/{retries} in {delay:.1f}s] {error}")
+        waiting.append([time.monotonic() + delay, item, attempt + 1])
+        return None
+
+    def start(item, attempt):
+        """提交一次；提交本身失败时按失败处理。返回需要立即产出的 (item, result, error) 或 None。"""
+        try:
+            job = submit(item)
+        except Exception as e:
+            return retry_later(item, attempt, e)
+        if job is None:
+            finish(item)
+            return item, None, None
+        in_flight.append([job, item, attempt, time.monotonic()])
+        return None
+
+    try:
+        while True:
+            now = time.monotonic()
+            for entry in [w for w in waiting if w[0] <= now]:
+                waiting.remove(entry)
+                immediate = start(entry[1], entry[2])
+                if immediate is not None:
+                    yield immediate
+            while not exhausted and len(in_flight) + len(waiting) < max_in_flight:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                immediate = start(item, 1)
+                if immediate is not None:
+                    yield immediate
+            if not in_flight:
+                if exhausted and not waiting:
+                    return
+                if waiting:
+                    time.sleep(max(0.0, min(w[0] for w in waiting) - time.monotonic()))
+                continue
+
+            progressed = False
+            now = time.monotonic()
+            for entry in list(in_flight):
+                job, item, attempt, started = entry
+                error = None
+                if job.done():
+                    in_flight.remove(entry)
+                    progressed = True
+                    try:
+                        result = job.result()
+                    except Exception as e:
+                        error = e
+                    else:
+                        finish(item)
+                        yield item, result, None
+                        continue
+                elif now - started > timeout:
+                    in_flight.remove(entry)
+                    progressed = True
+                    job.cancel()
+                    error = TimeoutError(f"no result after {timeout}s")
+                else:
+                    continue
+
+                immediate = retry_later(item, attempt, error)
+                if immediate is not None:
+                    yield immediate
+            if not progressed:
+                time.sleep(poll)
+    finally:
+        # 消费方提前结束时，取消仍在途的任务并清理
+        for job, item, _, _ in in_flight:
+            job.cancel()
+            finish(item)
+        for _, item, _ in waiting:
+            finish(item)
+        close = getattr(items, 'close', None)
+        if close is not None:
+            close()
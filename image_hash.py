@@ -0,0 +1,86 @@
+"""
+感知哈希（需要 Pillow + NumPy），用于在同一批截图中找出近似重复的图片。
+
+- dhash: 差异哈希，缩放到 (size+1)×size 灰度图，比较相邻像素；
+- phash: 缩放到 (size·4)² 灰度图做二维 DCT，取左上 size×size 低频系数与中位数比较。
+
+两者都返回 size² 位的整数，近似程度用 hamming() 衡量（0 为完全相同）。
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+
+def _grey(data, width, height):
+    with Image.open(io.BytesIO(data)) as img:
+        return np.asarray(img.convert('L').resize((width, height), Image.LANCZOS), dtype=np.float64)
+
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(data, size=8):
+    px = _grey(data, size + 1, size)
+    return _bits_to_int(px[:, 1:] > px[:, :-1])
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+
+
+def phash(data, size=8, factor=4):
+    n = size * factor
+    px = _grey(data, n, n)
+    m = _dct_matrix(n)
+    low = (m @ px @ m.T)[:size, :size]
+    # 直流分量（[0, 0]）不参与中位数
+    median = np.median(low.flatten()[1:])
+    return _bits_to_int(low > median)
+
+
+def image_hash(data, method='phash'):
+    """按 method 计算哈希；图片无法解码时返回 None。"""
+    try:
+        return phash(data) if method == 'phash' else dhash(data)
+    except Exception:
+        return None
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateIndex:
+    """
+    本次运行中已提交识别的图片：[(hash, key, value)]。
+    数量在几千以内，线性扫描足够快。
+    """
+
+    def __init__(self, max_distance):
+        self.max_distance = max_distance
+        self.entries = []
+
+    def add(self, h, key, value):
+        self.entries.append((h, key, value))
+
+    def remove(self, key):
+        self.entries = [e for e in self.entries if e[1] != key]
+
+    def nearest(self, h):
+        """返回距离不超过 max_distance 的最近条目 (key, value)，没有则返回 None。"""
+        best = None
+        best_distance = self.max_distance + 1
+        for other, key, value in self.entries:
+            d = hamming(h, other)
+            if d < best_distance:
+                best, best_distance = (key, value), d
+                if d == 0:
+                    break
+        return best
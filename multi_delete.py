@@ -1,9 +1,12 @@
 import csv
 import pywikibot
 
+from write_throttle import AdaptiveThrottle
+
 # 配置 pywikibot 站点，确保你在用户配置文件中正确设置站点
 site = pywikibot.Site('en', 'xyy')
 site.login()  # 使用配置的凭证登录
+throttle = AdaptiveThrottle.for_site(site)
 
 csv_file = 'pages_to_delete.txt'  # CSV 文件路径
 
@@ -24,7 +27,7 @@ def delete_pages_from_csv(csv_file, reason="Batch delete from CSV (delete to re-
 
                 if page.exists():
                     print(f"Deleting page: {page_title}")
-                    page.delete(reason=reason, prompt=False)
+                    throttle.call(page.delete, reason=reason, prompt=False)
                 else:
                     print(f"Page does not exist: {page_title}")
 
@@ -33,3 +36,4 @@ def delete_pages_from_csv(csv_file, reason="Batch delete from CSV (delete to re-
 
 # 调用批量删除功能
 delete_pages_from_csv(csv_file)
+print(throttle.summary())
@@ -2,8 +2,11 @@ import csv
 import pywikibot
 from pywikibot import page
 
+from write_throttle import AdaptiveThrottle
+
 site = pywikibot.Site('en', 'xyy')
 site.login()
+throttle = AdaptiveThrottle.for_site(site)
 
 no_redirect = True
 csv_file = 'pages_to_move.csv'
@@ -24,10 +27,11 @@ def move_pages_from_csv(csv_file, no_redirect=False):
                 try:
                     old_page = pywikibot.Page(site, old_page_title)
                     print(f"Moving page: {old_page_title} -> {new_page_title}")
-                    old_page.move(new_page_title, reason="Batch move from CSV", noredirect=no_redirect)
+                    throttle.call(old_page.move, new_page_title, reason="Batch move from CSV", noredirect=no_redirect)
 
                 except Exception as e:
                     print(f"Error moving {old_page_title} to {new_page_title}: {e}")
 
 
 move_pages_from_csv(csv_file, no_redirect)
+print(throttle.summary())
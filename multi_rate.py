@@ -1,8 +1,12 @@
 import pywikibot
 
+from page_rating import rate_page
+from write_throttle import AdaptiveThrottle
+
 # 站点
 site = pywikibot.Site('en', 'xyy')
 site.login()  # Must use account password; bot password does not work
+throttle = AdaptiveThrottle.for_site(site)
 
 rating_to = "GR"  # 两字母评级 codename (UR/ST/UF/FN/CD/LS/GR)
 reason = "Batch rating gallery articles"  # 统一理由
@@ -11,20 +15,12 @@ reason = "Batch rating gallery articles"  # 统一理由
 with open("pages_to_rate.txt", "r", encoding="utf-8") as f:
     pages = [line.strip() for line in f if line.strip()]
 
-# 获取 CSRF token
-token = site.tokens['csrf']
-
+# CSRF token 由 rate_page() 获取，失效（badtoken）时自动刷新
 for title in pages:
-    params = {
-        'action': 'change-rating',
-        'format': 'json',
-        'title': title,
-        'rating-to': rating_to,
-        'reason': reason,
-        'token': token
-    }
     try:
-        result = site.simple_request(**params).submit()
+        result = rate_page(site, title, rating_to, reason, throttle)
         print(f"Rated {title} -> {rating_to}: {result}")
     except Exception as e:
         print(f"Failed to rate {title}: {e}")
+
+print(throttle.summary())
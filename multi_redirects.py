@@ -1,8 +1,12 @@
 import csv
 import pywikibot
 
+from page_state import load_page_states
+from write_throttle import AdaptiveThrottle
+
 site = pywikibot.Site('en', 'xyy')
 site.login()
+throttle = AdaptiveThrottle.for_site(site)
 
 csv_file = 'pages_to_redirect.csv'
 
@@ -11,6 +15,7 @@ def create_redirects_from_csv(csv_file):
     with open(csv_file, 'r', encoding='utf-8') as file:
         reader = csv.reader(file)
 
+        pairs = []
         for row in reader:
             if len(row) >= 2:
                 source_title = row[0].strip()
@@ -18,23 +23,34 @@ def create_redirects_from_csv(csv_file):
 
                 if not source_title or not target_title:
                     continue
+                pairs.append((source_title, target_title))
 
-                try:
+    # 所有源页面的存在性一次批量查完；无效标题或加载失败的批次只跳过对应的行
+    errors = {}
+    states = load_page_states(site, [source for source, _ in pairs], errors=errors)
+    # 本次运行已创建的页面（CSV 中重复的源标题不再保存第二次）
+    created = set()
 
-                    source_page = pywikibot.Page(site, source_title)
+    for source_title, target_title in pairs:
+        try:
+            if source_title in errors:
+                raise errors[source_title]
 
-                    if source_page.exists():
-                        print(f"Page '{source_title}' already exists. Skipping...")
-                        continue
+            if states[source_title].exists or source_title in created:
+                print(f"Page '{source_title}' already exists. Skipping...")
+                continue
 
-                    redirect_content = f"#REDIRECT [[{target_title}]]"
+            redirect_content = f"#REDIRECT [[{target_title}]]"
 
-                    source_page.text = redirect_content
-                    source_page.save(summary=f"Creating redirect to [[{target_title}]]")
-                    print(f"Created redirect: {source_title} -> {target_title}")
+            source_page = states[source_title].page
+            source_page.text = redirect_content
+            throttle.call(source_page.save, summary=f"Creating redirect to [[{target_title}]]")
+            created.add(source_title)
+            print(f"Created redirect: {source_title} -> {target_title}")
 
-                except Exception as e:
-                    print(f"Error creating redirect for {source_title} -> {target_title}: {e}")
+        except Exception as e:
+            print(f"Error creating redirect for {source_title} -> {target_title}: {e}")
 
 
 create_redirects_from_csv(csv_file)
+print(throttle.summary())
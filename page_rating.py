@@ -0,0 +1,81 @@
+"""
+页面评级（change-rating API）。
+
+- rate_page(): 评级一个页面；CSRF token 失效（badtoken）时刷新 token 后重试一次；
+- RatingQueue: 后台线程依次评级，调用方（episode_create.py）创建页面时不用等评级返回，
+  close() 时等待队列清空，并把失败的评级再重试一遍。
+"""
+import queue
+import threading
+
+TOKEN_ERRORS = {'badtoken', 'notoken'}
+
+
+def _csrf_token(site, refresh=False):
+    if refresh:
+        site.tokens.clear()
+    return site.tokens['csrf']
+
+
+def rate_page(site, title, rating_to, reason, throttle=None):
+    """评级一个页面，返回 API 结果；失败时抛出异常。"""
+    for attempt in range(2):
+        params = {
+            'action': 'change-rating',
+            'format': 'json',
+            'title': title,
+            'rating-to': rating_to,
+            'reason': reason,
+            'token': _csrf_token(site, refresh=attempt > 0),
+        }
+        request = site.simple_request(**params)
+        try:
+            return throttle.call(request.submit) if throttle else request.submit()
+        except Exception as e:
+            if attempt or getattr(e, 'code', None) not in TOKEN_ERRORS:
+                raise
+            print(f"  [token] {title}: {e.code}, refreshing CSRF token")
+
+
+class RatingQueue:
+    def __init__(self, site, rating_to, reason, throttle=None):
+        self.site = site
+        self.rating_to = rating_to
+        self.reason = reason
+        self.throttle = throttle
+        self.rated = []
+        self.failed = {}  # title -> 最近一次的错误信息
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, title):
+        self._queue.put(title)
+
+    def _rate(self, title):
+        try:
+            result = rate_page(self.site, title, self.rating_to, self.reason, self.throttle)
+        except Exception as e:
+            self.failed[title] = f"{type(e).__name__}: {e}"
+            print(f"Failed to rate {title}: {e}")
+            return False
+        self.failed.pop(title, None)
+        self.rated.append(title)
+        print(f"Rated {title} -> {self.rating_to}: {result}")
+        return True
+
+    def _run(self):
+        while True:
+            title = self._queue.get()
+            if title is None:
+                return
+            self._rate(title)
+
+    def close(self, retry=True):
+        """等待已排队的评级完成；retry=True 时把失败的再依次重试一次。"""
+        self._queue.put(None)
+        self._thread.join()
+        if retry and self.failed:
+            print(f"Retrying {len(self.failed)} failed rating(s)...")
+            for title in list(self.failed):
+                self._rate(title)
@@ -0,0 +1,52 @@
+"""
+批量读取页面状态：存在与否、最新 revid、是否重定向，以及（可选）正文。
+
+load_page_states() 用多标题请求（site.preloadpages，每请求 chunk_size 个标题）一次查完，
+代替逐个 pywikibot.Page(...).exists() 的一页一个请求。
+"""
+from collections import namedtuple
+
+import pywikibot
+
+# page 为已加载的 pywikibot.Page，可以直接修改 text 后保存，不必再取一次
+PageState = namedtuple('PageState', ['title', 'exists', 'revid', 'redirect', 'text', 'page'])
+
+
+def load_page_states(site, titles, content=False, chunk_size=50, errors=None):
+    """
+    返回 {title: PageState}，键为调用方传入的标题（去重后）。
+    content=False 时只取元数据（prop=info），text 为 None。
+    errors 为 dict 时，无效标题（InvalidTitleError 等）与所在批次加载失败的标题记入
+    errors[title] = 异常，不出现在结果中，其余批次照常加载；errors 为 None 时直接抛出。
+    """
+    titles = list(dict.fromkeys(titles))
+    states = {}
+    for i in range(0, len(titles), chunk_size):
+        chunk = []
+        for title in titles[i:i + chunk_size]:
+            try:
+                chunk.append((title, pywikibot.Page(site, title)))
+            except Exception as e:
+                if errors is None:
+                    raise
+                errors[title] = e
+        try:
+            for _ in site.preloadpages([page for _, page in chunk], groupsize=chunk_size, content=content):
+                pass
+            for title, page in chunk:
+                exists = page.exists()
+                states[title] = PageState(
+                    title=title,
+                    exists=exists,
+                    revid=page.latest_revision_id if exists else None,
+                    redirect=page.isRedirectPage() if exists else False,
+                    text=(page.text if exists else '') if content else None,
+                    page=page,
+                )
+        except Exception as e:
+            if errors is None:
+                raise
+            for title, _ in chunk:
+                states.pop(title, None)
+                errors[title] = e
+    return states
@@ -0,0 +1,139 @@
+"""
+简单的多阶段流水线工具（线程 + 有界队列）。
+
+- background(): 在后台线程里迭代一个（通常会发网络请求的）生成器，提前取好结果放进有界队列；
+- ordered_map(): 用线程池并发执行某个阶段，但按输入顺序产出结果；
+- StageTimes: 记录各阶段累计耗时，运行结束时打印，用来判断瓶颈在哪个阶段。
+
+两者都保持输入顺序，因此下游打印的日志与串行执行时完全一致。
+
+关闭规则：每个阶段结束（读完、出错或被关闭）时，在迭代它上游的那个线程里关闭上游，
+消费方只需关闭最下游的一个；不会从另一个线程关闭正在执行的生成器。
+"""
+import contextlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Full, Queue
+
+_ITEM, _DONE, _ERROR = 'item', 'done', 'error'
+
+
+def _close(iterable):
+    close = getattr(iterable, 'close', None)
+    if close is not None:
+        close()
+
+
+def background(iterable, depth, join_timeout=5.0):
+    """
+    后台线程迭代 iterable，最多提前缓冲 depth 项。
+    iterable 中抛出的异常会在消费方取到该位置时重新抛出。
+    消费方关闭（或提前结束）时通知后台线程停止并等待它最多 join_timeout 秒；
+    iterable 由后台线程自己关闭。
+    """
+    q = Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                q.put(entry, timeout=0.2)
+                return True
+            except Full:
+                continue
+        return False
+
+    def worker():
+        try:
+            for item in iterable:
+                if stop.is_set() or not put((_ITEM, item)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_ERROR, e))
+        finally:
+            try:
+                _close(iterable)
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=worker, name='prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            try:
+                kind, value = q.get(timeout=0.2)
+            except Empty:
+                if not thread.is_alive():
+                    return
+                continue
+            if kind == _DONE:
+                return
+            if kind == _ERROR:
+                raise value
+            yield value
+    finally:
+        stop.set()
+        thread.join(join_timeout)
+
+
+def ordered_map(fn, iterable, workers=1, depth=None):
+    """
+    用 workers 个线程并发执行 fn(item)，最多 depth 个任务同时在途，按输入顺序产出结果。
+    fn 抛出的异常在消费方取到该结果时重新抛出。结束或被关闭时关闭 iterable。
+    """
+    depth = max(depth or workers * 2, 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for item in iterable:
+                pending.append(executor.submit(fn, item))
+                if len(pending) >= depth:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            _close(iterable)
+
+
+class StageTimes:
+    """各阶段的累计耗时与处理项数（线程安全）。workers: {阶段名: 线程数}，用于计算利用率。"""
+
+    def __init__(self, workers=None):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.busy = {}
+        self.items = {}
+        self.workers = dict(workers or {})
+
+    def add(self, stage, seconds, items=1):
+        with self._lock:
+            self.busy[stage] = self.busy.get(stage, 0.0) + seconds
+            self.items[stage] = self.items.get(stage, 0) + items
+
+    @contextlib.contextmanager
+    def measure(self, stage, items=1):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - t0, items)
+
+    def summary(self):
+        """
+        每个阶段一行：处理项数、累计耗时、平均每项耗时，以及利用率
+        （累计耗时 / (总墙钟时间 × 该阶段线程数)）；利用率接近 100% 的阶段就是瓶颈。
+        """
+        wall = time.perf_counter() - self.started
+        lines = [f"{'stage':<12} {'items':>7} {'busy s':>9} {'avg s':>8} {'util':>6}"]
+        for stage, busy in self.busy.items():
+            n = self.items[stage]
+            workers = self.workers.get(stage, 1)
+            util = busy / (wall * workers) if wall > 0 else 0.0
+            lines.append(f"{stage:<12} {n:>7} {busy:>9.1f} {busy / n if n else 0:>8.2f} {util:>6.0%}")
+        lines.append(f"wall time {wall:.1f}s")
+        return '\n'.join(lines)
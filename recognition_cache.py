@@ -0,0 +1,109 @@
+"""
+WeslieSearch-Vision 识别结果缓存（SQLite）。
+
+以文件 SHA1（imageinfo 直接给出，无需下载）为键，保存 Gradio 返回的原始首条结果
+以及解析出的 (season_code, ep_num)。同一张图片（重传、崩溃后重跑、不同文件名的重复截图）
+命中缓存时既不下载也不调用模型。
+
+用缩略图识别的结果键为 "<sha1>@<width>px"，原图的结果键为 sha1 本身；
+用原图识别时只取原图的结果，用缩略图识别时先取同宽度的结果，没有再取原图的结果。
+
+淘汰策略：超过 ttl_days 的条目视为过期；条目数超过 max_entries 时删除最早写入的。
+模型更新后可用 refresh=True（脚本的 --refresh-cache）忽略已有条目并重新写入。
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_TTL_DAYS = 180
+DEFAULT_MAX_ENTRIES = 200000
+
+# result 中原始结果保存的项数（一条结果占前 6 项）
+RAW_RESULT_ITEMS = 6
+
+CachedRecognition = namedtuple('CachedRecognition', ['season_code', 'ep_num', 'raw', 'cached_at'])
+
+
+def cache_key(sha1, width=None):
+    return f"{sha1}@{width}px" if width else sha1
+
+
+class RecognitionCache:
+    def __init__(self, path, ttl_days=DEFAULT_TTL_DAYS, max_entries=DEFAULT_MAX_ENTRIES, refresh=False):
+        self.path = path
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.max_entries = max_entries
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        # 下载 / 识别可能在多个线程中进行，用一把锁串行化
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS recognition ('
+            ' sha1 TEXT PRIMARY KEY,'
+            ' season_code TEXT NOT NULL,'
+            ' ep_num TEXT NOT NULL,'
+            ' raw TEXT NOT NULL,'
+            ' cached_at REAL NOT NULL)'
+        )
+        self.conn.commit()
+        self.evict()
+
+    def get(self, sha1, width=None):
+        """
+        返回 CachedRecognition；未命中、已过期或 refresh 模式下返回 None。
+        width 为识别所用缩略图的宽度（None 为原图）。
+        """
+        if not sha1 or self.refresh:
+            self.misses += 1
+            return None
+        keys = [cache_key(sha1, width)] + ([sha1] if width else [])
+        row = None
+        with self._lock:
+            for key in keys:
+                row = self.conn.execute(
+                    'SELECT season_code, ep_num, raw, cached_at FROM recognition WHERE sha1 = ?', (key,)
+                ).fetchone()
+                if row is not None:
+                    break
+        if row is None or (self.ttl and time.time() - row[3] > self.ttl):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedRecognition(row[0], row[1], json.loads(row[2]), row[3])
+
+    def put(self, sha1, result, season_code, ep_num, width=None):
+        """width 为识别所用缩略图的宽度（None 为原图）。"""
+        if not sha1:
+            return
+        raw = json.dumps(list(result[:RAW_RESULT_ITEMS]) if result else [], ensure_ascii=False, default=str)
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO recognition (sha1, season_code, ep_num, raw, cached_at) VALUES (?, ?, ?, ?, ?)',
+                (cache_key(sha1, width), season_code, ep_num, raw, time.time())
+            )
+            self.conn.commit()
+
+    def evict(self):
+        """删除过期条目，并把条目数压到 max_entries 以内（先删最早写入的）。"""
+        with self._lock:
+            if self.ttl:
+                self.conn.execute('DELETE FROM recognition WHERE cached_at < ?', (time.time() - self.ttl,))
+            if self.max_entries:
+                self.conn.execute(
+                    'DELETE FROM recognition WHERE sha1 IN ('
+                    ' SELECT sha1 FROM recognition ORDER BY cached_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+            self.conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM recognition').fetchone()[0]
+
+    def close(self):
+        self.evict()
+        self.conn.close()
@@ -0,0 +1,51 @@
+"""
+人工复查队列（JSONL，每行一条记录）。
+
+无人值守运行时，需要人工判断的页面追加到队列文件后立即继续处理下一页；
+之后再用一次交互会话集中处理队列。
+"""
+import json
+import os
+import time
+
+
+class ReviewQueue:
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, record):
+        """追加一条记录并立即落盘（进程中断也不会丢失已入队的记录）。"""
+        record = dict(record)
+        record.setdefault('queued_at', time.strftime('%Y-%m-%dT%H:%M:%S'))
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+
+    def load(self):
+        """
+        读取全部记录。同一标题多次入队时只保留最后一条（即最新看到的版本）。
+        返回按首次出现顺序排列的记录列表。
+        """
+        if not os.path.isfile(self.path):
+            return []
+        records = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    print(f"[WARN] {self.path}: skipped malformed line")
+                    continue
+                records[rec['title']] = rec
+        return list(records.values())
+
+    def rewrite(self, records):
+        """用 records 原子地替换整个队列文件（先写临时文件再 os.replace）。"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
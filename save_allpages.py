@@ -1,9 +1,10 @@
+import argparse
+import os
+
 import pywikibot
 import csv
 
-# 指定站点
-site = pywikibot.Site('en', 'xyy')
-site.login()
+from sweep_checkpoint import DEFAULT_FLUSH_EVERY, SweepCheckpoint
 
 # 要处理的名字空间
 namespaces = [0]  # 例如 主空间=0, Talk=1, User=2
@@ -11,23 +12,78 @@ namespaces = [0]  # 例如 主空间=0, Talk=1, User=2
 # 输出 CSV 文件
 output_file = "pages_list.csv"
 
-with open(output_file, "w", encoding="utf-8", newline="") as f:
-    writer = csv.writer(f)
-    # 写表头
-    writer.writerow(["Page title"])
-
-    for ns in namespaces:
-        for page in site.allpages(namespace=ns):
-            # if page.isRedirectPage():
-            #     continue
-            writer.writerow([page.title()])
-            print(f"Wrote: {page.title()}")
-            # try:
-            #     title = page.title()
-            #     length = len(page.text.encode("utf-8"))  # 字节数
-            #     writer.writerow([title, length])
-            #     print(f"Wrote: {title} ({length} bytes)")
-            # except Exception as e:
-            #     print(f"Error processing {page.title()}: {e}")
-
-print(f"✅ 已保存到 {output_file}")
+# 断点续跑状态文件
+state_file = "save_allpages.state.json"
+
+
+def save_all_pages(site, namespaces, output_file, checkpoint):
+    resuming = checkpoint.resumed and os.path.isfile(output_file)
+    if resuming:
+        # 截掉上次最后一次落盘之后写入的行，避免续跑时重复
+        with open(output_file, "r+b") as f:
+            f.truncate(checkpoint.state.get('output_offset', 0))
+
+    with open(output_file, "a" if resuming else "w", encoding="utf-8", newline="") as f:
+        def flush_output():
+            f.flush()
+            os.fsync(f.fileno())
+            return {'output_offset': f.tell()}
+
+        checkpoint.before_flush = flush_output
+
+        writer = csv.writer(f)
+        if not resuming:
+            # 写表头
+            writer.writerow(["Page title"])
+
+        try:
+            for ns in namespaces:
+                if checkpoint.skip_namespace(ns, namespaces):
+                    continue
+                start = checkpoint.start_for(ns)
+                if start:
+                    start = pywikibot.Page(site, start).title(with_ns=False)
+                for page in site.allpages(start=start or '!', namespace=ns):
+                    title = page.title()
+                    if checkpoint.is_done(ns, title):
+                        continue
+                    # if page.isRedirectPage():
+                    #     continue
+                    writer.writerow([title])
+                    print(f"Wrote: {title}")
+                    # try:
+                    #     title = page.title()
+                    #     length = len(page.text.encode("utf-8"))  # 字节数
+                    #     writer.writerow([title, length])
+                    #     print(f"Wrote: {title} ({length} bytes)")
+                    # except Exception as e:
+                    #     print(f"Error processing {page.title()}: {e}")
+                    checkpoint.record(ns, title, 'written')
+        except BaseException:
+            # 中断时把已写出的行和进度一起落盘，下次 --resume 只补剩下的页面
+            checkpoint.flush()
+            print(f"Interrupted; progress saved to {checkpoint.path} — {checkpoint.summary()}")
+            raise
+        checkpoint.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Save all page titles of the given namespaces to CSV")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the previous interrupted run instead of starting over")
+    parser.add_argument("--flush-every", type=int, default=DEFAULT_FLUSH_EVERY,
+                        help="Write the checkpoint every N pages (default: %(default)s)")
+    args = parser.parse_args()
+
+    # 指定站点
+    site = pywikibot.Site('en', 'xyy')
+    site.login()
+
+    checkpoint = SweepCheckpoint(state_file, resume=args.resume, flush_every=args.flush_every)
+    save_all_pages(site, namespaces, output_file, checkpoint)
+
+    print(f"✅ 已保存到 {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+单季剧集数据集：Template:Episode/<Season>.json 与 PGP 导出 JSON 按集数合并后的结果。
+
+每集一条 EpisodeRecord，页面标题、序数词、中文页面名、英文简介、YouTube ID 都已算好，
+create_page_content() 直接取用，不再对每一集扫描整份 PGP 数据。
+
+SeasonDataset.for_season() 把合并结果存到本地目录，键为 (季度代号, wiki JSON 的 revid,
+PGP 文件的路径/大小/修改时间)；输入没变时重新运行直接读取，不再解析和合并。
+"""
+import hashlib
+import json
+import os
+import re
+from collections import namedtuple
+from urllib.parse import urlparse, parse_qs
+
+from episode_json import EpisodeJsonCache
+
+DEFAULT_CACHE_DIR = ".season_dataset_cache"
+
+EpisodeRecord = namedtuple('EpisodeRecord', [
+    'num', 'page_title', 'english', 'chinese', 'pinyin',
+    'ordinal', 'zh_page_name', 'summary_en', 'yt_id',
+])
+
+
+def to_ordinal(n):
+    ones = ['', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine']
+    firsts = ['', 'first', 'second', 'third', 'fourth', 'fifth', 'sixth', 'seventh', 'eighth', 'ninth']
+    teens = ['tenth', 'eleventh', 'twelfth', 'thirteenth', 'fourteenth', 'fifteenth', 'sixteenth', 'seventeenth', 'eighteenth', 'nineteenth']
+    tens = ['', '', 'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety']
+    tenths = ['', '', 'twentieth', 'thirtieth', 'fortieth', 'fiftieth', 'sixtieth', 'seventieth', 'eightieth', 'ninetieth']
+
+    res = ''
+    if n >= 100:
+        res += ones[n // 100] + ' hundred'
+        n %= 100
+    if n == 0:
+        res += 'th'
+        return res
+    else:
+        res += ' and ' if res else ''
+    if n >= 20:
+        if n % 10 == 0:
+            res += tenths[n // 10]
+        else:
+            res += tens[n // 10] + '-' + firsts[n % 10]
+    elif n >= 10:
+        res += teens[n - 10]
+    else:
+        res += firsts[n]
+    return res
+
+
+def extract_youtube_id(url):
+    try:
+        if "youtu.be/" in url:
+            return url.split("youtu.be/")[1].split("?")[0]
+        if "youtube.com/watch" in url:
+            query = parse_qs(urlparse(url).query)
+            return query.get("v", [None])[0]
+    except Exception:
+        return None
+    return None
+
+
+def episode_page_title(episode):
+    title = episode['english']
+    if 'suffix' in episode:
+        title += f" ({episode['suffix']})"
+    return title
+
+
+def load_pgp(path):
+    """读取 PGP 导出的 JSON（列表）；文件不存在或无法解析时打印原因并返回 None。"""
+    if not os.path.isfile(path):
+        print("File not found:", path)
+        return None
+    try:
+        with open(path, "r", encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"Failed to parse local JSON file: {e}")
+        return None
+    print(f"Loaded local JSON data from {path}")
+    return data
+
+
+def build_records(wiki_json, pgp_data=None):
+    """按集数合并 wiki JSON 的 episodes 与 PGP 数据；同一集数在 PGP 中出现多次时取第一条。"""
+    pgp_by_num = {}
+    for ep in pgp_data or []:
+        pgp_by_num.setdefault(ep.get("集数"), ep)
+
+    records = []
+    for episode in wiki_json['episodes']:
+        extra = pgp_by_num.get(episode['num'], {})
+        yt_url = extra.get("链接（YouTube中文）")
+        records.append(EpisodeRecord(
+            num=episode['num'],
+            page_title=episode_page_title(episode),
+            english=episode['english'],
+            chinese=episode['chinese'],
+            pinyin=episode['pinyin'],
+            ordinal=to_ordinal(episode['num']),
+            zh_page_name=extra.get("页面名") or episode['chinese'],
+            summary_en=extra.get("剧情简介（YouTube英文）") or None,
+            yt_id=extract_youtube_id(yt_url) if yt_url else None,
+        ))
+    return records
+
+
+def _pgp_signature(path):
+    if not path:
+        return 'nopgp'
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+
+class SeasonDataset:
+    def __init__(self, season_name, season_abbr, episodes):
+        self.season_name = season_name
+        self.season_abbr = season_abbr
+        self.episodes = episodes
+        self.by_num = {ep.num: ep for ep in episodes}
+
+    @classmethod
+    def build(cls, season_name, season_abbr, wiki_json, pgp_data=None):
+        return cls(season_name, season_abbr, build_records(wiki_json, pgp_data))
+
+    @classmethod
+    def for_season(cls, season_name, season_abbr, pgp_path=None,
+                   cache_dir=DEFAULT_CACHE_DIR, json_cache=None):
+        """
+        取回 wiki JSON（EpisodeJsonCache；json_cache 已 load() 过这一季时不再查询）并与 PGP 文件合并；
+        本地已有相同输入的合并结果时直接读取。pgp_path 无法读取时按没有 PGP 数据处理。
+        """
+        json_cache = json_cache or EpisodeJsonCache()
+        wiki_json = json_cache.get(season_name)
+        if pgp_path and not os.path.isfile(pgp_path):
+            print("File not found:", pgp_path)
+            pgp_path = None
+
+        safe = re.sub(r'[^0-9A-Za-z]+', '_', season_abbr).strip('_')
+        path = os.path.join(cache_dir, f"{safe}.r{json_cache.revids[season_name]}.{_pgp_signature(pgp_path)}.json")
+        if os.path.isfile(path):
+            try:
+                dataset = cls.load(path)
+            except (KeyError, TypeError, ValueError):
+                # 旧格式或损坏的缓存文件，重新合并
+                dataset = None
+            if dataset is not None and dataset.season_name == season_name:
+                return dataset
+
+        pgp_data = load_pgp(pgp_path) if pgp_path else None
+        dataset = cls.build(season_name, season_abbr, wiki_json, pgp_data)
+        if pgp_data is not None or not pgp_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            dataset.save(path)
+        return dataset
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                'season_name': self.season_name,
+                'season_abbr': self.season_abbr,
+                'fields': EpisodeRecord._fields,
+                'episodes': [list(ep) for ep in self.episodes],
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        fields = data['fields']
+        episodes = [EpisodeRecord(**dict(zip(fields, row))) for row in data['episodes']]
+        return cls(data['season_name'], data['season_abbr'], episodes)
+
+    def __iter__(self):
+        return iter(self.episodes)
+
+    def __len__(self):
+        return len(self.episodes)
+
+    def get(self, num):
+        return self.by_num.get(num)
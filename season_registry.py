@@ -0,0 +1,119 @@
+"""
+季度代号注册表（全部小写）。
+
+模块导入时一次性建好前缀树，之后按标题长度线性匹配 File:<season><number>.png，
+供 file_cleanup.py / episode_create.py / autogen_filesource.py 共用。
+"""
+import re
+
+SEASON_CODES = (
+    's1', 'pgabbw', 'xyyyhtl', 'pgsg', 'yyydh', 'jos', 'yykldyn', 'sd', 'qsmxxyy', 'happy happy bang bang', 'hhbb', 'gkljy', 'tac', 'jjdlm', 'thd', 'kxrj', 'hf', 'kxfcs', 'ptac', 'lyyddc', 'dlw', 'yyxxy', "the tailor's closet", 'ttc', 'ycdmx', 'lyb', 'mmlfk', 'aitpw', 'yssjlxj', 'mttnw', 'xh1', 'xhcsj', 'tld', 'yyxzt', 'aits', 'shlxj', 'mttnw2', 'xh2', 'woi', 'fmdzz', 'flying island', 'fitsa', 'qhtkd', 'mttnw3', 'xh3', 'mld', 'ycshz', 'ys1', 'woi2', 'rat', 'kskjb', 'mttnw4', 'xh4', 'tiag', 'qqwxk', 'mld2', 'ys2', 'mld3', 'ys3', 'atdf', 'ygdyj', 'dfv', 'kcsl', 'ultimate battle', 'mld4', 'ys4', 'ubtng', 'jzcsd', 'mld5', 'ys5', 'tgr', 'qhdyj', 'mld6', 'ys6', 'tst', 'ycsjc', 'mld7', 'ys7', 'moa', 'aysmy', "explore wolffy's mind", 'mld8', 'ys8', 'ewm', 'xsjqy', 'mld9', 'ys9', 'ch', 'fkcny', 'mld10', 'ys10', 'mwr', 'qxdyj', 'mld11', 'ys11', 'nwc', 'kyxyz', 'atwi20d', 'atwi2d', 'atwitd', 'xyyysb', 'epg', 'yydyxyy', 'mjt', 'mwmr', 'jrjjhtl', 'pgfc', 'pgfc1', 'zqyxt1', 'anp', 'ap', 'pgfc2', 'zqyxt2', 'saf', 'pgfc3', 'pgfctec', 'zqyxt3', 'tec', 'pgfc4', 'zqyxt4', 'tatw', 'pgfc5', 'zqyxt5', 'iw', 'pgfc6', 'zqyxt6', 'ft', 'mgs', 'yyqmx', 'mgs2', 'mgsii', 'yyqmx2', 'movie1', 'm1', 'tsa', 'nqct', 'movie2', 'm2', 'dttaotlt', 'hhsw', 'movie3', 'm3', 'mctsa', 'tndgg', 'movie4', 'm4', 'miaotdt', 'kxcln', 'movie5', 'm5', 'tma', 'xqyygsn', 'movie6', 'm6', 'mtp', 'fmqyj', 'movie7', 'm7', 'apg', 'ynxyy', 'movie8', 'm8', 'dff', 'kcwl', 'movie9', 'm9', 'twg', 'sh', 'movie10', 'm10', 'bnd', 'ygpx', 'live-action1', 'la1', 'ilw', 'wahtl', 'live-action2', 'la2', 'ilw2', 'wahtl2'
+)
+
+_SEASON_SET = frozenset(SEASON_CODES)
+
+# 前缀树：每个节点是 dict(char -> 子节点)，键 _END 表示有代号在此结束
+_END = ''
+
+
+def _build_trie(codes):
+    root = {}
+    for code in codes:
+        node = root
+        for ch in code:
+            node = node.setdefault(ch, {})
+        node[_END] = code
+    return root
+
+
+_TRIE = _build_trie(SEASON_CODES)
+
+# 单季集数上限，用来排除 File:MttNW201.png 被拆成 MttNW 第 201 集这类拆分
+MAX_EPISODE_NUMBER = 200
+
+_FILE_PREFIX = 'file:'
+_PNG_SUFFIX = '.png'
+
+
+def season_prefixes(s, start=0):
+    """
+    返回 s[start:] 开头所有匹配的季度代号（s 需已小写），按长度从长到短排列。
+    只遍历一次前缀树，O(len(s))。
+    """
+    found = []
+    node = _TRIE
+    for i in range(start, len(s)):
+        node = node.get(s[i])
+        if node is None:
+            break
+        if _END in node:
+            found.append(node[_END])
+    found.reverse()
+    return found
+
+
+def is_episode_number(number):
+    """number 是否为 episode_create.py 写出的集数：{num:02d} 格式，1 到 MAX_EPISODE_NUMBER。"""
+    if len(number) < 2 or not number.isdecimal() or (len(number) > 2 and number[0] == '0'):
+        return False
+    return 1 <= int(number) <= MAX_EPISODE_NUMBER
+
+
+def match_file_title(title):
+    """
+    解析 File:<season><number>.png（大小写不敏感）。
+    返回 (season_code_lower, number_str) 或 None；number 保留原样（可能有前导零）。
+
+    多个代号都能匹配时（例如 YS1 / YS11、PGFC / PGFC1），与旧正则一样优先取最短的代号，
+    但只接受集数合法（is_episode_number）的拆分：File:YS1104.png -> ('ys1', '104')，
+    File:PGFC101.png -> ('pgfc', '101')，而 File:MttNW201.png 中 201 超出范围，
+    取 ('mttnw2', '01')。都不合法时取剩余集数至少两位的最长代号，再退回一位数集数。
+    """
+    s = title.lower()
+    if not (s.startswith(_FILE_PREFIX) and s.endswith(_PNG_SUFFIX)):
+        return None
+    body_end = len(s) - len(_PNG_SUFFIX)
+    splits = []  # 按代号从长到短
+    for code in season_prefixes(s, len(_FILE_PREFIX)):
+        number = s[len(_FILE_PREFIX) + len(code):body_end]
+        if number.isdecimal():
+            splits.append((code, number))
+    if len(splits) <= 1:
+        return splits[0] if splits else None
+    for code, number in reversed(splits):
+        if is_episode_number(number):
+            return code, number
+    for code, number in splits:
+        if len(number) >= 2:
+            return code, number
+    return splits[0]
+
+
+def is_season_code(code):
+    """code 是否为已注册的季度代号（大小写不敏感，忽略首尾空白）。"""
+    return bool(code) and code.strip().lower() in _SEASON_SET
+
+
+def canonical_season_code(code):
+    """
+    规范化季度代号：去掉首尾空白并把连续空白压成一个空格。
+    已注册的返回规范化后的代号（保留原大小写），未注册的返回 None。
+    """
+    if not code:
+        return None
+    code = re.sub(r'\s+', ' ', code.strip())
+    return code if code.lower() in _SEASON_SET else None
+
+
+def navigation_template(season_abbr):
+    """
+    由季度缩写推出导航模板名：去掉末尾的全部季数数字，得到的代号已注册时使用它，
+    例如 MttNW2 -> MttNW，MLD11 -> MLD；未注册时退回旧规则，只去掉最后一位数字。
+    没有末尾数字时原样返回。
+    """
+    base = season_abbr.rstrip('0123456789')
+    if base == season_abbr:
+        return season_abbr
+    if base and is_season_code(base):
+        return base
+    return season_abbr[:-1]
@@ -1,27 +1,27 @@
+import argparse
 import csv
-import json
 import re
 from collections import defaultdict
 
 import pywikibot
-import requests
+
+import edit_plan
+from episode_json import EpisodeJsonCache
+from page_state import load_page_states
+from wikitext_sections import SectionIndex
+import write_throttle
+from write_throttle import AdaptiveThrottle
 
 
 WIKI_FAMILY = "xyy"
 WIKI_LANG = "en"
 CSV_PATH = "still_episode.csv"
 
-# 识别不到时使用这个
-DEFAULT_SEASON_NAME = 'Martial World Rescue'  # e.g., "Explore Wolffy’s Mind"
+# 文件名中识别不到季名时归入这个季（--default-season）；为 None 时这些文件只报告、不移动
+DEFAULT_SEASON_NAME = None  # e.g., "Explore Wolffy’s Mind"
 
 EDIT_SUMMARY = "Moved stills to episode gallery. Powered by WeslieSearch-Vision (https://tuxiaobei-wesliesearch-vision.ms.show)"
 
-API_BASE = "https://xyy.miraheze.org/w/api.php"
-HEADERS = {"User-Agent": "Mozilla/5.0"}
-
-GALLERY_HEADER_RE = re.compile(r'(?im)^==\s*Gallery\s*==\s*$')
-WATCH_HEADER_RE = re.compile(r'(?im)^==\s*Watch\s*==\s*$')
-NEXT_LEVEL2_HEADER_RE = re.compile(r'(?im)^==[^=\n].*?==\s*$')
 GALLERY_BLOCK_RE = re.compile(r'(?is)<gallery>(.*?)</gallery>')
 FILE_LINE_RE = re.compile(r'(?im)^\s*(File:[^\n]+?)\s*$')
 
@@ -33,77 +33,52 @@ def normalize_file_title(s: str) -> str:
     return s
 
 
-def detect_season_name_from_first_row(first_row):
+def detect_season_name(file_title: str, default=None):
     """
     规则：
-    - 第一行形如:
-      File:Explore Wolffy’s Mind still 1.jpg,1
+    - 文件名形如:
+      File:Explore Wolffy’s Mind still 1.jpg
       那么提取 File: 和 still 之间的部分，得到 Explore Wolffy’s Mind
-    - 如果识别不到，用 DEFAULT_SEASON_NAME
+    - 如果识别不到，返回 default（默认 None）
     """
-    if not first_row or len(first_row) < 1:
-        return DEFAULT_SEASON_NAME
-
-    cell = first_row[0].strip()
-    m = re.search(r'^File:(.+?)\s+still\b', cell, re.IGNORECASE)
-    if m:
-        season_name = m.group(1).strip()
-        if season_name:
-            return season_name
-
-    return DEFAULT_SEASON_NAME
+    m = re.search(r'^File:(.+?)\s+still\b', file_title.strip(), re.IGNORECASE)
+    if m and m.group(1).strip():
+        return m.group(1).strip()
+    return default
 
 
-def read_csv(csv_path: str):
+def read_csv(csv_path: str, default_season=None):
+    """
+    流式读取识别结果 CSV（file,episode），每一行单独判断所属季。
+    返回 ({(season_name, ep_num): [file_title, ...]}（保持首次出现的顺序，去重）,
+          识别不到季名且没有 default_season 的文件列表)。
+    """
+    groups = defaultdict(dict)
+    unmatched = {}
+    rows = 0
     with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
-        rows = list(csv.reader(f))
+        for row in csv.reader(f):
+            rows += 1
+            if len(row) < 2:
+                continue
+            file_title = normalize_file_title(row[0])
+            ep_raw = row[1].strip()
+            if not ep_raw:
+                continue
+            try:
+                ep_num = int(ep_raw)
+            except ValueError:
+                continue
+            season_name = detect_season_name(file_title, default_season)
+            if season_name is None:
+                unmatched[file_title] = None
+                continue
+            groups[(season_name, ep_num)][file_title] = None
 
     if not rows:
         raise ValueError("CSV is empty.")
 
-    season_name = detect_season_name_from_first_row(rows[0])
-    if not season_name:
-        raise ValueError(
-            "Cannot detect season name from first CSV row, and DEFAULT_SEASON_NAME is not set."
-        )
-
-    ep_to_files = defaultdict(list)
-
-    # 第一行也要参与归类；它既包含文件名也包含集数
-    for row in rows:
-        if len(row) < 2:
-            continue
-        file_title = normalize_file_title(row[0])
-        ep_raw = row[1].strip()
-        if not ep_raw:
-            continue
-        try:
-            ep_num = int(ep_raw)
-        except ValueError:
-            continue
-        if file_title not in ep_to_files[ep_num]:
-            ep_to_files[ep_num].append(file_title)
-
-    return season_name, ep_to_files
-
-
-def fetch_json_data(season_name: str):
-    params = {
-        "action": "parse",
-        "page": f"Template:Episode/{season_name.replace(' ', '_')}.json",
-        "prop": "wikitext",
-        "formatversion": "2",
-        "format": "json",
-        "origin": "*"
-    }
-    response = requests.get(API_BASE, params=params, headers=HEADERS, timeout=30)
-    response.raise_for_status()
-    data = response.json()
-
-    if "parse" not in data or "wikitext" not in data["parse"]:
-        raise RuntimeError(f"Unexpected API response: {data}")
-
-    return json.loads(data["parse"]["wikitext"])
+    return {key: list(files) for key, files in groups.items()}, list(unmatched)
 
 
 def get_episode_list(json_data):
@@ -138,11 +113,12 @@ def merge_into_gallery(text: str, file_titles: list[str]) -> tuple[str, bool]:
     if not to_add:
         return old_text, False
 
-    gallery_match = GALLERY_HEADER_RE.search(old_text)
-    if gallery_match:
-        sec_start = gallery_match.end()
-        next_header = NEXT_LEVEL2_HEADER_RE.search(old_text, pos=sec_start)
-        sec_end = next_header.start() if next_header else len(old_text)
+    # 二级 header 只扫描一次；Gallery 段（含其下级子段落）与 Watch 位置都从索引里取
+    index = SectionIndex(old_text)
+    gallery = index.get("gallery", level=2)
+    if gallery:
+        sec_start = gallery.content_start
+        sec_end = index.end_with_subsections(gallery)
 
         section = old_text[sec_start:sec_end]
         block_match = GALLERY_BLOCK_RE.search(section)
@@ -167,7 +143,7 @@ def merge_into_gallery(text: str, file_titles: list[str]) -> tuple[str, bool]:
                 + new_inner
                 + section[block_match.end(1):]
             )
-            new_text = old_text[:sec_start] + new_section + old_text[sec_end:]
+            new_text = index.splice(sec_start, sec_end, new_section)
             return new_text, new_text != old_text
 
         gallery_block = "<gallery>\n" + "\n".join(to_add) + "\n</gallery>\n"
@@ -178,8 +154,8 @@ def merge_into_gallery(text: str, file_titles: list[str]) -> tuple[str, bool]:
         new_text = prefix + gallery_block + suffix
         return new_text, new_text != old_text
 
-    watch_match = WATCH_HEADER_RE.search(old_text)
-    insert_pos = watch_match.start() if watch_match else len(old_text)
+    watch = index.get("watch", level=2)
+    insert_pos = watch.start if watch else len(old_text)
 
     gallery_section = (
         "==Gallery==\n"
@@ -200,82 +176,141 @@ def merge_into_gallery(text: str, file_titles: list[str]) -> tuple[str, bool]:
     return new_text, new_text != old_text
 
 
-def main():
+def get_site():
     site = pywikibot.Site(WIKI_LANG, WIKI_FAMILY)
     site.login()
+    return site
 
-    season_name, ep_to_files = read_csv(CSV_PATH)
-    print("Season name:", season_name)
-    print("CSV episodes:", sorted(ep_to_files.keys()))
 
-    json_data = fetch_json_data(season_name)
-    episodes = get_episode_list(json_data)
-
-    ep_to_titles = defaultdict(list)
-    for ep in episodes:
-        n = episode_num(ep)
-        if n is None:
-            continue
-        title = episode_page_title(ep)
-        if title not in ep_to_titles[n]:
-            ep_to_titles[n].append(title)
-
-    for ep_num in sorted(ep_to_files.keys()):
-        if ep_num not in ep_to_titles:
-            print(f"[Skip] episode {ep_num}: not found in JSON.")
+def main():
+    parser = argparse.ArgumentParser(description="Move recognised stills into episode galleries")
+    parser.add_argument("--csv", default=CSV_PATH, help="Recognition CSV (default: %(default)s)")
+    parser.add_argument("--default-season", default=DEFAULT_SEASON_NAME, metavar="NAME",
+                        help="Season for files whose name has no '<Season> still N' pattern "
+                             "(default: report and skip them)")
+    edit_plan.add_arguments(parser)
+    write_throttle.add_arguments(parser)
+    args = parser.parse_args()
+    write_throttle.configure(args)
+
+    if edit_plan.run_plan_command(args, get_site):
+        return
+    plan = edit_plan.PlanWriter(args.plan) if args.plan else None
+
+    site = get_site()
+    throttle = AdaptiveThrottle.for_site(site)
+
+    groups, unmatched = read_csv(args.csv, args.default_season)
+    if unmatched:
+        print(f"[Warn] {len(unmatched)} file(s) have no season in their name and will be skipped "
+              f"(use --default-season):")
+        for title in unmatched:
+            print("   ", title)
+    seasons = sorted({season for season, _ in groups})
+    all_files = list(dict.fromkeys(f for files in groups.values() for f in files))
+    print(f"CSV: {len(all_files)} files, {len(groups)} episodes in {len(seasons)} season(s)")
+
+    # 改动任何页面之前，先批量确认所有引用的 File 页面都存在
+    file_states = load_page_states(site, all_files)
+    missing = {title for title, state in file_states.items() if not state.exists}
+    if missing:
+        print(f"[Warn] {len(missing)} file(s) do not exist and will not be added:")
+        for title in sorted(missing):
+            print("   ", title)
+
+    # 所有季的 JSON 一次取回（本地缓存 + 一个 revid 查询）
+    season_data = EpisodeJsonCache().load(seasons, skip_missing=True)
+
+    season_ep_titles = {}
+    for season_name, json_data in season_data.items():
+        ep_to_titles = defaultdict(list)
+        for ep in get_episode_list(json_data):
+            n = episode_num(ep)
+            if n is None:
+                continue
+            title = episode_page_title(ep)
+            if title not in ep_to_titles[n]:
+                ep_to_titles[n].append(title)
+        season_ep_titles[season_name] = ep_to_titles
+
+    # 要改动的剧集页面（存在性 + 正文）一次批量取回
+    page_titles = [title
+                   for (season_name, ep_num) in groups
+                   for title in season_ep_titles.get(season_name, {}).get(ep_num, [])]
+    page_states = load_page_states(site, page_titles, content=True)
+
+    for season_name in seasons:
+        print(f"\n=== Season: {season_name} ===")
+        if season_name not in season_ep_titles:
+            print(f"[Skip] Template:Episode/{season_name}.json does not exist.")
             continue
+        ep_to_titles = season_ep_titles[season_name]
 
-        files = ep_to_files[ep_num]
-
-        for page_title in ep_to_titles[ep_num]:
-            page = pywikibot.Page(site, page_title)
-            if not page.exists():
-                print(f"[Skip] {page_title}: page does not exist.")
+        for ep_num in sorted(ep for season, ep in groups if season == season_name):
+            if ep_num not in ep_to_titles:
+                print(f"[Skip] episode {ep_num}: not found in JSON.")
                 continue
 
-            old_text = page.text or ""
-            new_text, changed = merge_into_gallery(old_text, files)
-
-            if not changed:
-                print(f"[No change] {page_title}")
+            files = [f for f in groups[(season_name, ep_num)] if f not in missing]
+            if not files:
                 continue
 
-            # page.text = new_text
-            # page.save(summary=EDIT_SUMMARY)
-            # print(f"[Saved] {page_title}: added {len(files)} files for episode {ep_num}")
-            import difflib
-
-            def show_diff(old_text: str, new_text: str, title: str):
-                old_lines = (old_text or "").splitlines()
-                new_lines = (new_text or "").splitlines()
-
-                diff = difflib.unified_diff(
-                    old_lines,
-                    new_lines,
-                    fromfile=f"{title} (old)",
-                    tofile=f"{title} (new)",
-                    lineterm=""
-                )
-
-                print("\n".join(diff))
-
-            # ===== diff + 首次确认机制 =====
-            if not hasattr(main, "_confirmed"):
-                print("\n================ DIFF PREVIEW ================")
-                show_diff(old_text, new_text, page_title)
-                print("=============================================\n")
-
-                ans = input("Apply this and all subsequent edits? (y/N): ").strip().lower()
-                if ans != "y":
-                    print("Aborted by user.")
-                    return
-
-                main._confirmed = True
-            # ============================================
-
-            page.text = new_text
-            page.save(summary=EDIT_SUMMARY)
-            print(f"[Saved] {page_title}: added {len(files)} files for episode {ep_num}")
+            for page_title in ep_to_titles[ep_num]:
+                state = page_states[page_title]
+                if not state.exists:
+                    print(f"[Skip] {page_title}: page does not exist.")
+                    continue
+                page = state.page
+
+                old_text = state.text or ""
+                new_text, changed = merge_into_gallery(old_text, files)
+
+                if not changed:
+                    print(f"[No change] {page_title}")
+                    continue
+
+                if plan is not None:
+                    plan.add(page, old_text, new_text, EDIT_SUMMARY)
+                    continue
+
+                # page.text = new_text
+                # page.save(summary=EDIT_SUMMARY)
+                # print(f"[Saved] {page_title}: added {len(files)} files for episode {ep_num}")
+                import difflib
+
+                def show_diff(old_text: str, new_text: str, title: str):
+                    old_lines = (old_text or "").splitlines()
+                    new_lines = (new_text or "").splitlines()
+
+                    diff = difflib.unified_diff(
+                        old_lines,
+                        new_lines,
+                        fromfile=f"{title} (old)",
+                        tofile=f"{title} (new)",
+                        lineterm=""
+                    )
+
+                    print("\n".join(diff))
+
+                # ===== diff + 首次确认机制 =====
+                if not hasattr(main, "_confirmed"):
+                    print("\n================ DIFF PREVIEW ================")
+                    show_diff(old_text, new_text, page_title)
+                    print("=============================================\n")
+
+                    ans = input("Apply this and all subsequent edits? (y/N): ").strip().lower()
+                    if ans != "y":
+                        print("Aborted by user.")
+                        return
+
+                    main._confirmed = True
+                # ============================================
+
+                page.text = new_text
+                throttle.call(page.save, summary=EDIT_SUMMARY)
+                print(f"[Saved] {page_title}: added {len(files)} files for episode {ep_num}")
+
+    print(throttle.summary())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+"""
+allpages 长时间遍历的断点续跑状态。
+
+状态文件（JSON）很小：只记录续跑位置（名字空间 + 最后处理完的标题）和各结果计数，
+每处理 flush_every 个页面原子地重写一次（写临时文件后 os.replace）。
+逐页结果追加到旁边的 <state>.log.jsonl，与状态文件同时落盘。
+"""
+import json
+import os
+import time
+
+DEFAULT_FLUSH_EVERY = 50
+
+
+def _atomic_write_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SweepCheckpoint:
+    """
+    用法：
+        cp = SweepCheckpoint(path, resume=args.resume)
+        for page in site.allpages(namespace=ns, start=cp.start_for(ns)):
+            if cp.is_done(ns, page.title()): continue
+            ...
+            cp.record(ns, page.title(), outcome)
+        cp.finish()
+
+    before_flush: 可选回调，在每次写状态前调用，返回的 dict 会合并进状态
+    （例如输出文件已 flush 到的字节偏移）。
+    """
+
+    def __init__(self, path, resume=False, flush_every=DEFAULT_FLUSH_EVERY, before_flush=None):
+        self.path = path
+        self.log_path = path + '.log.jsonl'
+        self.flush_every = max(1, flush_every)
+        self.before_flush = before_flush
+        self._pending = []
+
+        self.state = None
+        if resume and os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+            if self.state.get('finished'):
+                print(f"Previous sweep in {path} already finished; starting over.")
+                self.state = None
+            else:
+                print(f"Resuming after {self.state.get('last_title')!r} "
+                      f"({self.state.get('processed', 0)} pages already handled).")
+        elif resume:
+            print(f"No checkpoint at {path}; starting from the beginning.")
+
+        if self.state is None:
+            self.state = {
+                'namespace': None,
+                'last_title': None,
+                'processed': 0,
+                'counts': {},
+                'finished': False,
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            # 新的一轮：丢弃旧的逐页日志
+            if os.path.isfile(self.log_path):
+                os.remove(self.log_path)
+
+    @property
+    def resumed(self):
+        return self.state['last_title'] is not None
+
+    def skip_namespace(self, namespace, order):
+        """多名字空间遍历时，续跑前已完成的名字空间直接跳过。order 为名字空间的遍历顺序列表。"""
+        last_ns = self.state['namespace']
+        return last_ns is not None and last_ns in order and order.index(namespace) < order.index(last_ns)
+
+    def start_for(self, namespace):
+        """该名字空间的 allpages 起点（含）；没有断点时为 None。"""
+        if self.state['namespace'] == namespace:
+            return self.state['last_title']
+        return None
+
+    def is_done(self, namespace, title):
+        """allpages(start=...) 含起点本身，续跑时跳过上次最后处理完的那一页。"""
+        return self.state['namespace'] == namespace and self.state['last_title'] == title
+
+    def record(self, namespace, title, outcome):
+        self.state['namespace'] = namespace
+        self.state['last_title'] = title
+        self.state['processed'] += 1
+        counts = self.state['counts']
+        counts[outcome] = counts.get(outcome, 0) + 1
+        self._pending.append({'ns': namespace, 'title': title, 'outcome': outcome})
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.before_flush is not None:
+            self.state.update(self.before_flush())
+        if self._pending:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                for rec in self._pending:
+                    f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending = []
+        self.state['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        _atomic_write_json(self.path, self.state)
+
+    def finish(self):
+        self.state['finished'] = True
+        self.flush()
+
+    def summary(self):
+        counts = ', '.join(f"{k}={v}" for k, v in sorted(self.state['counts'].items()))
+        return f"{self.state['processed']} pages ({counts})"
@@ -0,0 +1,105 @@
+"""
+一次扫描的 wikitext 段落索引。
+
+SectionIndex 只对文本跑一遍 header 正则，之后按（小写）标题 O(1) 查找段落、
+取原始段落切片，以及基于已记录的偏移量拼接/替换出新文本（不再重新扫描）。
+"""
+import re
+from collections import namedtuple
+
+# 与 file_cleanup.py 历来使用的 header 正则相同（整行都是 header 才算）
+HEADER_REGEX = re.compile(r'^(?P<header>={2,}\s*(?P<title>.+?)\s*={2,})\s*$', re.MULTILINE|re.IGNORECASE)
+
+# header: 原始 header 文本；title: 去空白后的标题；key: 小写标题；level: '=' 个数（两侧取较小值）；
+# balanced: 两侧 '=' 个数相同
+# start: header 起点；header_end: header 文本结束处；content_start: 正则匹配结束处（段落内容起点）；
+# end: 下一个 header（任意级别）的起点或文本末尾
+Section = namedtuple('Section', ['header', 'title', 'key', 'level', 'balanced',
+                                 'start', 'header_end', 'content_start', 'end'])
+
+
+def _header_runs(header):
+    """header 两侧 '=' 的个数 (lead, trail)。"""
+    return len(header) - len(header.lstrip('=')), len(header) - len(header.rstrip('='))
+
+
+class SectionIndex:
+    def __init__(self, text, header_regex=HEADER_REGEX):
+        self.text = text or ''
+        self.sections = []
+        self._by_key = {}
+        self._position = {}  # start -> 在 sections 中的下标
+
+        matches = list(header_regex.finditer(self.text))
+        for i, m in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(self.text)
+            title = m.group('title').strip()
+            header = m.group('header')
+            lead, trail = _header_runs(header)
+            sec = Section(header, title, title.lower(), min(lead, trail), lead == trail,
+                          m.start(), m.end('header'), m.end(), end)
+            self._by_key.setdefault(sec.key, []).append(len(self.sections))
+            self._position[sec.start] = len(self.sections)
+            self.sections.append(sec)
+
+    @property
+    def leading(self):
+        """第一个 header 之前的文本；没有 header 时为全文。"""
+        return self.text[:self.sections[0].start] if self.sections else self.text
+
+    def keys(self):
+        return [sec.key for sec in self.sections]
+
+    def __contains__(self, title):
+        return title.strip().lower() in self._by_key
+
+    def __len__(self):
+        return len(self.sections)
+
+    def get(self, title, level=None):
+        """
+        按标题（大小写不敏感）取第一个匹配的段落；找不到返回 None。
+        level 给定时只匹配两侧都恰好是 level 个 '=' 的 header（==Gallery==），
+        ===Gallery== 这类两侧不等的不算。
+        """
+        for i in self._by_key.get(title.strip().lower(), ()):
+            sec = self.sections[i]
+            if level is None or (sec.balanced and sec.level == level):
+                return self.sections[i]
+        return None
+
+    def block(self, title, level=None):
+        """段落原始内容（header 之后到下一个 header 之前，不做 strip）；找不到返回 None。"""
+        sec = self.get(title, level)
+        if sec is None:
+            return None
+        return self.text[sec.content_start:sec.end]
+
+    def end_with_subsections(self, sec):
+        """
+        段落连同其下级子段落的结束位置（下一个同级或更高级 header 的起点）。
+        下一个 header 的级别按左侧 '=' 个数算，===Sub== 仍算作 == 段落下的子段落。
+        """
+        i = self._position[sec.start]
+        for nxt in self.sections[i + 1:]:
+            if _header_runs(nxt.header)[0] <= sec.level:
+                return nxt.start
+        return len(self.text)
+
+    def splice(self, start, end, replacement):
+        """用 replacement 替换 text[start:end]，返回新文本（索引本身不变）。"""
+        return self.text[:start] + replacement + self.text[end:]
+
+    def insert(self, pos, snippet):
+        return self.splice(pos, pos, snippet)
+
+    def replace_block(self, title, new_content, level=None, with_subsections=False):
+        """
+        替换指定段落的内容（保留 header 行），返回新文本；段落不存在时返回 None。
+        with_subsections=True 时连同下级子段落一起替换。
+        """
+        sec = self.get(title, level)
+        if sec is None:
+            return None
+        end = self.end_with_subsections(sec) if with_subsections else sec.end
+        return self.splice(sec.content_start, end, new_content)
@@ -0,0 +1,220 @@
+"""
+自适应写入节流（替代各脚本里固定的 sleep / pywikibot 固定的 put_throttle）。
+
+AdaptiveThrottle.call(fn, ...) 负责两次写入之间的间隔：
+- 服务器健康（保存耗时低于 target_latency）时每次把间隔乘以 speedup，逐步加速；
+- 保存变慢时放慢，遇到 429 / 503 / maxlag / ratelimited 时间隔加倍（乘性减速），
+  并按 Retry-After（没有则指数退避）等待后重试，最多 max_retries 次；
+- 其他异常原样抛出，由脚本自己的错误处理打印。
+
+for_site() 给脚本用：从站点原来的固定间隔（pywikibot 的 put_throttle / writedelay，
+默认 10 秒）起步，健康时最快加速到下限 min_interval，并把 pywikibot 的 put_throttle
+调到同一个下限（仍由它兜底）。下限与目标耗时是显式的设置：
+- MIN_WRITE_INTERVAL / FLOOR_FRACTION：下限默认为 writedelay × FLOOR_FRACTION，
+  但不低于 MIN_WRITE_INTERVAL 秒（默认 10 秒 → 2.5 秒）；
+- TARGET_LATENCY：单次保存超过这个秒数就放慢；
+带 argparse 的脚本用 add_arguments() / configure() 提供
+--min-write-interval / --target-save-latency 覆盖它们。
+pywikibot 会在内部重试 maxlag / 429 / 503，这里只处理重试用尽后抛出来的错误
+（Page.save 抛出的 OtherPageSaveError 会先解开到里面的 APIError / ServerError）。
+
+metrics() / summary() 给出当前速率、总退避时间、重试次数等。
+"""
+import threading
+import time
+
+RETRYABLE_CODES = {'maxlag', 'ratelimited', 'readonly', 429, 503}
+
+MIN_WRITE_INTERVAL = 1.0
+FLOOR_FRACTION = 0.25
+TARGET_LATENCY = 2.0
+min_write_interval = None  # --min-write-interval；None 时按 FLOOR_FRACTION 计算
+target_latency = TARGET_LATENCY
+
+
+def add_arguments(parser):
+    """给脚本的 argparse 加上 --min-write-interval / --target-save-latency。"""
+    parser.add_argument("--min-write-interval", type=float, default=None, metavar="SECONDS",
+                        help=f"Fastest pace saves may speed up to (default: {FLOOR_FRACTION:g} x the "
+                             f"site's put_throttle, at least {MIN_WRITE_INTERVAL:g}s)")
+    parser.add_argument("--target-save-latency", type=float, default=TARGET_LATENCY, metavar="SECONDS",
+                        help="Slow down when a save takes longer than this (default: %(default)s)")
+
+
+def configure(args):
+    global min_write_interval, target_latency
+    min_write_interval = args.min_write_interval
+    target_latency = args.target_save_latency
+
+
+def floor_for(writedelay):
+    """for_site() 使用的下限：--min-write-interval，否则 writedelay × FLOOR_FRACTION（不低于 MIN_WRITE_INTERVAL）。"""
+    if min_write_interval is not None:
+        return min_write_interval
+    return max(MIN_WRITE_INTERVAL, writedelay * FLOOR_FRACTION)
+
+
+def _causes(exc):
+    """exc 以及包在里面的异常：.reason（pywikibot 的 OtherPageSaveError）、__cause__、__context__。"""
+    seen = set()
+    while isinstance(exc, BaseException) and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        reason = getattr(exc, 'reason', None)
+        if isinstance(reason, BaseException):
+            exc = reason
+        else:
+            exc = exc.__cause__ or exc.__context__
+
+
+def retry_hint(exc):
+    """
+    判断异常是否属于服务器要求放慢（可重试），返回 (retryable, retry_after 秒或 None)。
+    兼容 pywikibot 的 APIError（.code 为 'maxlag' 等）/ ServerError（包括被
+    OtherPageSaveError 包装的情况），以及带 .code/.status 与 .headers 的 HTTP 异常（urllib、requests）。
+    """
+    for cause in _causes(exc):
+        retryable, retry_after = _retry_hint(cause)
+        if retryable:
+            return retryable, retry_after
+    return False, None
+
+
+def _retry_hint(exc):
+    code = getattr(exc, 'code', None)
+    if code is None:
+        response = getattr(exc, 'response', None)
+        code = getattr(response, 'status_code', None) or getattr(exc, 'status', None)
+    retryable = code in RETRYABLE_CODES or type(exc).__name__ == 'ServerError'
+    retry_after = None
+    headers = getattr(exc, 'headers', None) or getattr(getattr(exc, 'response', None), 'headers', None)
+    if headers is not None:
+        try:
+            retry_after = float(headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            retry_after = None
+    if retry_after is None and code == 'maxlag':
+        # API 的 maxlag 错误里带有当前延迟秒数
+        lag = (getattr(exc, 'other', None) or {}).get('lag')
+        if lag is not None:
+            retry_after = float(lag)
+    return retryable, retry_after
+
+
+class AdaptiveThrottle:
+    def __init__(self, interval=1.0, min_interval=0.5, max_interval=60.0, speedup=0.85,
+                 target_latency=2.0, max_backoff=300.0, max_retries=5):
+        self.interval = max(interval, min_interval)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.speedup = speedup
+        self.target_latency = target_latency
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._last = None
+        self.writes = 0
+        self.retries = 0
+        self.failures = 0
+        self.total_backoff = 0.0
+        self.total_latency = 0.0
+        self.started = time.monotonic()
+
+    @classmethod
+    def for_site(cls, site, **kwargs):
+        """
+        从站点配置的 writedelay 起步（interval 未给出时），下限为 floor_for(writedelay)；
+        pywikibot 的 put_throttle 同时调到这个下限。
+        """
+        writedelay = site_writedelay(site)
+        kwargs.setdefault('min_interval', floor_for(writedelay))
+        kwargs.setdefault('interval', max(writedelay, kwargs['min_interval']))
+        kwargs.setdefault('target_latency', target_latency)
+        set_site_writedelay(site, kwargs['min_interval'])
+        return cls(**kwargs)
+
+    def _wait_turn(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._last is not None:
+                delay = self._last + self.interval - now
+                if delay > 0:
+                    time.sleep(delay)
+            self._last = time.monotonic()
+
+    def _slow_down(self, factor=2.0):
+        self.interval = min(self.max_interval, max(self.interval, self.min_interval) * factor)
+
+    def observe(self, latency):
+        """一次写入成功：健康时加速，耗时超过 target_latency 时放慢。"""
+        with self._lock:
+            self.writes += 1
+            self.total_latency += latency
+            if latency > self.target_latency:
+                self._slow_down(1.25)
+            else:
+                self.interval = max(self.min_interval, self.interval * self.speedup)
+
+    def call(self, fn, *args, **kwargs):
+        """按当前节奏执行一次写入 fn(*args, **kwargs)；服务器要求放慢时退避并重试。"""
+        attempt = 0
+        while True:
+            self._wait_turn()
+            t0 = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                retryable, retry_after = retry_hint(e)
+                if not retryable or attempt >= self.max_retries:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                attempt += 1
+                with self._lock:
+                    self._slow_down()
+                    self.retries += 1
+                    backoff = retry_after if retry_after is not None else self.interval * 2 ** (attempt - 1)
+                    backoff = min(self.max_backoff, backoff)
+                    self.total_backoff += backoff
+                print(f"  [throttle] {type(e).__name__}: {e}; retry {attempt}/{self.max_retries} in {backoff:.1f}s")
+                time.sleep(backoff)
+                continue
+            self.observe(time.monotonic() - t0)
+            return result
+
+    def metrics(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            'writes': self.writes,
+            'retries': self.retries,
+            'failures': self.failures,
+            'interval_s': round(self.interval, 3),
+            'current_rate_per_min': round(60 / self.interval, 1) if self.interval else None,
+            'average_rate_per_min': round(self.writes * 60 / elapsed, 1) if elapsed else None,
+            'average_latency_s': round(self.total_latency / self.writes, 3) if self.writes else None,
+            'total_backoff_s': round(self.total_backoff, 1),
+        }
+
+    def summary(self):
+        m = self.metrics()
+        return (f"Writes: {m['writes']} ({m['failures']} failed, {m['retries']} retried), "
+                f"avg {m['average_rate_per_min']}/min, current {m['current_rate_per_min']}/min, "
+                f"backoff {m['total_backoff_s']}s")
+
+
+def site_writedelay(site):
+    """pywikibot 为该站点配置的写入间隔（config.put_throttle，秒）；取不到时为 0。"""
+    throttle = getattr(site, 'throttle', None)
+    try:
+        return float(getattr(throttle, 'writedelay', 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def set_site_writedelay(site, seconds):
+    """把 pywikibot 的写入间隔（put_throttle）设为 seconds。"""
+    throttle = getattr(site, 'throttle', None)
+    if hasattr(throttle, 'set_delays'):
+        throttle.set_delays(writedelay=seconds)
+    elif throttle is not None:
+        throttle.writedelay = seconds